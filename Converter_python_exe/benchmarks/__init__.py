@@ -0,0 +1,13 @@
+"""Бенчмарки конвертера MonitorHead.
+
+Запуск из папки Converter_python_exe:
+
+    python -m benchmarks.generate session.txt --size 100MB
+    python -m benchmarks.run --sizes 10MB 100MB --formats csv xlsx -o results.json
+    python -m benchmarks.startup --repeat 5
+
+generate создает синтетический файл MonitorHead заданного размера,
+run замеряет этапы движка (чтение, разбор, запись, конвертация целиком)
+и сохраняет строк/с, МБ/с и пиковую память в JSON, startup замеряет
+время запуска приложения до первой отрисовки окна.
+"""
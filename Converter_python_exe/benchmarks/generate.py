@@ -0,0 +1,157 @@
+"""Генератор синтетических файлов MonitorHead.
+
+Данные похожи на запись реальной сессии: Time_ms с шагом ~10 мс
+и ведущими нулями, углы PITCH/ROLL/YAW - плавное блуждание головы
+с отрицательными значениями и ведущими нулями (как их обрабатывает
+remove_leading_zeros_decimal), флаги Dizziness/Nystagmus - эпизоды
+по несколько секунд. Между данными встречаются комментарии, пустые
+строки и изредка неполные строки.
+
+    python -m benchmarks.generate session.txt --size 100MB --seed 1
+"""
+import sys
+import argparse
+
+import numpy as np
+
+# Строк в одном пакете генерации
+BATCH_ROWS = 100_000
+
+# Доля "шумных" строк по умолчанию: поровну пустые, комментарии,
+# неполные строки и строки с лишним ';'
+NOISE = 0.001
+
+HEADER = "# MonitorHead\n# Time_ms;PITCH;ROLL;YAW;Dizziness;Nystagmus\n"
+
+_UNITS = {'': 1, 'B': 1, 'KB': 1 << 10, 'MB': 1 << 20, 'GB': 1 << 30}
+
+
+def parse_size(text):
+    """Размер из строки: 500KB, 10MB, 2GB или число байт"""
+    text = text.strip().upper()
+    number = text.rstrip('KMGB')
+    unit = text[len(number):]
+    if unit not in _UNITS or not number:
+        raise ValueError(f"Неверный размер: {text}")
+    return int(float(number) * _UNITS[unit])
+
+
+def format_size(size):
+    """Короткая запись размера для имен файлов и отчетов: 10MB"""
+    for unit in ('GB', 'MB', 'KB'):
+        if size >= _UNITS[unit] and size % _UNITS[unit] == 0:
+            return f"{size // _UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+def _angles(rng, count, start):
+    """Плавное блуждание угла в пределах [-180, 180]"""
+    walk = start + np.cumsum(rng.normal(0, 0.3, count))
+    return (walk + 180) % 360 - 180
+
+
+def _format_angles(rng, values):
+    """Углы в текстовом виде MonitorHead: часть с ведущими нулями, часть с запятой"""
+    padded = rng.random(len(values)) < 0.5
+    comma = rng.random(len(values)) < 0.1
+    texts = [f"{v:08.3f}" if pad else f"{v:.2f}" for v, pad in zip(values.tolist(), padded)]
+    return [t.replace('.', ',') if c else t for t, c in zip(texts, comma)]
+
+
+def _flags(rng, count, state):
+    """Флаг эпизодами: переключение в среднем раз в несколько секунд"""
+    switches = rng.random(count) < 0.0005
+    flags = (np.cumsum(switches) + state) % 2
+    return flags.astype(np.uint8)
+
+
+def generate_lines(rng, rows=None, noise=NOISE):
+    """Текст файла пакетами по BATCH_ROWS строк (без заголовка).
+
+    Выдает (текст, число строк); без rows генерация бесконечна.
+    noise - доля шумных строк (0 - только данные).
+    """
+    time_ms = 0
+    angles = [0.0, 0.0, 0.0]
+    flags = [0, 0]
+    done = 0
+    while rows is None or done < rows:
+        count = BATCH_ROWS if rows is None else min(BATCH_ROWS, rows - done)
+        steps = rng.choice([9, 10, 10, 10, 11], count)
+        times = time_ms + np.cumsum(steps)
+        time_ms = int(times[-1])
+
+        columns = [[f"{t:08d}" for t in times.tolist()]]
+        for i in range(3):
+            values = _angles(rng, count, angles[i])
+            angles[i] = float(values[-1])
+            columns.append(_format_angles(rng, values))
+        for i in range(2):
+            values = _flags(rng, count, flags[i])
+            flags[i] = int(values[-1])
+            columns.append(values.astype(str).tolist())
+
+        lines = [';'.join(row) for row in zip(*columns)]
+        if noise:
+            dice = rng.random(count)
+            for index in np.flatnonzero(dice < noise).tolist():
+                kind = dice[index] / noise * 4
+                if kind < 1:
+                    lines[index] = ''
+                elif kind < 2:
+                    lines[index] = '# метка оператора'
+                elif kind < 3:
+                    lines[index] = ';'.join(lines[index].split(';')[:4])
+                else:
+                    lines[index] += ';'
+        done += count
+        yield '\n'.join(lines) + '\n', count
+
+
+def generate_session(path, size=None, rows=None, seed=0, noise=NOISE):
+    """Создает файл MonitorHead размером около size байт (по целым строкам)
+    или из rows строк.
+
+    Возвращает число строк (вместе с шумными).
+    """
+    if rows is None and size is None:
+        raise ValueError("Нужно указать size или rows")
+    rng = np.random.default_rng(seed)
+    total_rows = 0
+    with open(path, 'wb') as f:
+        written = f.write(HEADER.encode('utf-8'))
+        for text, count in generate_lines(rng, rows, noise):
+            data = text.encode('utf-8')
+            last = size is not None and written + len(data) >= size
+            if last:
+                data = data[:data.rfind(b'\n', 0, size - written) + 1]
+                count = data.count(b'\n')
+            written += f.write(data)
+            total_rows += count
+            if last:
+                break
+    return total_rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='benchmarks.generate',
+        description='Генератор синтетических файлов MonitorHead'
+    )
+    parser.add_argument('output', help='создаваемый файл .txt')
+    parser.add_argument('--size', type=parse_size, help='размер файла: 10MB, 1GB ...')
+    parser.add_argument('--rows', type=int, help='число строк данных')
+    parser.add_argument('--seed', type=int, default=0, help='зерно генератора')
+    parser.add_argument('--noise', type=float, default=NOISE,
+                        help=f'доля пустых, комментариев и неполных строк (по умолчанию {NOISE})')
+    args = parser.parse_args(argv)
+    if args.size is None and args.rows is None:
+        parser.error("укажите --size или --rows")
+
+    rows = generate_session(args.output, args.size, args.rows, args.seed, args.noise)
+    print(f"{args.output}: {rows:,} строк")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""Замер производительности этапов движка конвертации.
+
+Для каждого размера создается синтетический файл (benchmarks.generate),
+затем каждый этап запускается в отдельном процессе, чтобы пиковая
+память (RSS) относилась только к нему:
+
+    read      - чтение файла блоками (map_blocks) с подсчетом CRC32 каждого
+                блока, чтобы страницы действительно читались с диска
+    parse     - разбор (parse_file) выбранными парсерами
+    write     - только запись в формат: чанки разобраны заранее и в
+                замер не входят (пиковая память включает их)
+    convert   - конвертация целиком (converter_engine.convert)
+
+    python -m benchmarks.run --sizes 10MB 100MB --formats csv xlsx -o results.json
+"""
+import sys
+import os
+import json
+import zlib
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import converter_engine
+from converter_profile import peak_rss
+from benchmarks.generate import NOISE, generate_session, parse_size, format_size
+
+STAGES = ('read', 'parse', 'write', 'convert')
+
+
+def run_stage(stage, input_file, output_format=None, parser='vectorized', workers=1):
+    """Выполняет этап в текущем процессе; возвращает (секунды, строк данных, пик RSS)"""
+    total_bytes = os.path.getsize(input_file)
+    rows = None
+
+    if stage == 'read':
+        started = time.perf_counter()
+        checksum = 0
+        with open(input_file, 'rb') as f:
+            for block in converter_engine.map_blocks(f):
+                # Без обращения к байтам отображение не читает страницы
+                checksum = zlib.crc32(block, checksum)
+        elapsed = time.perf_counter() - started
+
+    elif stage == 'parse':
+        started = time.perf_counter()
+        rows = sum(len(chunk) for chunk, _, _ in
+                   converter_engine.parse_file(input_file, total_bytes, parser, workers))
+        elapsed = time.perf_counter() - started
+
+    elif stage in ('write', 'convert'):
+        output_file = converter_engine.default_output_path(input_file, output_format)
+        if stage == 'write':
+            chunks = [chunk for chunk, _, _ in
+                      converter_engine.parse_file(input_file, total_bytes, parser, workers)
+                      if len(chunk)]
+            started = time.perf_counter()
+            output = converter_engine.open_output(output_file, output_format)
+            for chunk in chunks:
+                output.write_chunk(chunk)
+            output.close()
+            elapsed = time.perf_counter() - started
+            rows = sum(len(chunk) for chunk in chunks)
+            paths = output.paths
+        else:
+            started = time.perf_counter()
+            result = converter_engine.convert(input_file, output_file, output_format,
+                                              parser=parser, workers=workers)
+            elapsed = time.perf_counter() - started
+            rows = result.rows
+            paths = result.output_files
+        for path in paths:
+            os.remove(path)
+
+    else:
+        raise ValueError(f"Неизвестный этап: {stage}")
+
+    return elapsed, rows, peak_rss()
+
+
+def measure(stage, input_file, output_format=None, parser='vectorized', workers=1, repeat=1):
+    """Лучшее из repeat измерений этапа, каждое в новом процессе"""
+    best = None
+    context = multiprocessing.get_context('spawn')
+    for _ in range(repeat):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            elapsed, rows, rss = pool.submit(run_stage, stage, input_file, output_format,
+                                             parser, workers).result()
+        if best is None or elapsed < best[0]:
+            best = (elapsed, rows, rss)
+
+    elapsed, rows, rss = best
+    size = os.path.getsize(input_file)
+    return {
+        'stage': stage,
+        'format': output_format,
+        'parser': parser if stage != 'read' else None,
+        'workers': workers,
+        'input_bytes': size,
+        'rows': rows,
+        'seconds': round(elapsed, 4),
+        'rows_per_s': round(rows / elapsed) if rows and elapsed else None,
+        'mb_per_s': round(size / elapsed / (1 << 20), 2) if elapsed else None,
+        'peak_rss': rss,
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment():
+    """Версии и окружение для сопоставления результатов между выпусками"""
+    versions = {'python': platform.python_version()}
+    for name in ('numpy', 'pandas', 'xlsxwriter', 'pyarrow'):
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            versions[name] = None
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'versions': versions,
+    }
+
+
+def run_benchmarks(sizes, formats, stages=STAGES, parsers=('vectorized',), workers=1,
+                   repeat=1, workdir=None, seed=0, noise=NOISE, on_result=None):
+    """Прогоняет этапы для всех размеров; возвращает словарь для JSON"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = workdir or tmp
+        os.makedirs(workdir, exist_ok=True)
+        for size in sizes:
+            input_file = os.path.join(workdir,
+                                      f"monitorhead_{format_size(size)}_{seed}_{noise:g}.txt")
+            # Сгенерированные файлы в workdir переиспользуются между запусками
+            if not os.path.exists(input_file):
+                generate_session(input_file, size=size, seed=seed, noise=noise)
+
+            runs = []
+            if 'read' in stages:
+                runs.append(('read', None, 'vectorized'))
+            for parser in parsers:
+                if 'parse' in stages:
+                    runs.append(('parse', None, parser))
+                for output_format in formats:
+                    for stage in ('write', 'convert'):
+                        if stage in stages:
+                            runs.append((stage, output_format, parser))
+
+            for stage, output_format, parser in runs:
+                result = measure(stage, input_file, output_format, parser, workers, repeat)
+                result['size'] = format_size(size)
+                results.append(result)
+                if on_result:
+                    on_result(result)
+
+    return {**environment(), 'seed': seed, 'noise': noise, 'results': results}
+
+
+def format_result(result):
+    """Строка таблицы для вывода в консоль"""
+    name = result['stage'] + (f":{result['format']}" if result['format'] else '')
+    if result['parser'] and result['parser'] != 'vectorized':
+        name += f" ({result['parser']})"
+    rows_per_s = f"{result['rows_per_s']:>12,}" if result['rows_per_s'] else f"{'':>12}"
+    rss = f"{result['peak_rss'] / (1 << 20):8.0f} МБ" if result['peak_rss'] else ''
+    return f"{result['size']:>6} {name:<20} {result['seconds']:9.2f} с " \
+           f"{result['mb_per_s']:8.1f} МБ/с {rows_per_s} строк/с {rss}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='benchmarks.run',
+        description='Замер производительности конвертера MonitorHead'
+    )
+    parser.add_argument('--sizes', nargs='+', type=parse_size, default=[parse_size('10MB')],
+                        help='размеры синтетических файлов (по умолчанию 10MB)')
+    parser.add_argument('--formats', nargs='+', choices=list(converter_engine.FORMATS),
+                        default=['csv', 'xlsx'], help='форматы для этапов write и convert')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES),
+                        help='замеряемые этапы')
+    parser.add_argument('--parsers', nargs='+', choices=converter_engine.PARSERS,
+                        default=['vectorized'], help='способы разбора')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='число процессов разбора (как у converter_engine)')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='повторов каждого замера, берется лучший')
+    parser.add_argument('--seed', type=int, default=0, help='зерно генератора данных')
+    parser.add_argument('--noise', type=float, default=NOISE,
+                        help='доля пустых, комментариев и неполных строк в данных')
+    parser.add_argument('--workdir', help='папка для сгенерированных файлов (кэш между запусками)')
+    parser.add_argument('-o', '--output', help='файл JSON с результатами')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        args.sizes, args.formats, args.stages, args.parsers, args.workers,
+        args.repeat, args.workdir, args.seed, args.noise,
+        on_result=lambda result: print(format_result(result), flush=True)
+    )
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Результаты: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""Замер времени запуска приложения: до первой отрисовки окна
+и до окончания фоновой загрузки движка (pandas, numpy, xlsxwriter).
+
+Приложение запускается с ключом --startup-benchmark, после загрузки
+движка записывает отметки времени в JSON и закрывается. Можно замерить
+и собранный .exe (PyInstaller --onefile распаковывается при каждом
+запуске):
+
+    python -m benchmarks.startup --repeat 5
+    python -m benchmarks.startup --exe dist/ConverterTxtToExcel.exe -o startup.json
+
+Без дисплея (CI, сервер) используйте QT_QPA_PLATFORM=offscreen.
+"""
+import sys
+import os
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+from benchmarks.run import environment
+
+APP_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          'converter_app.py')
+
+# Предел ожидания одного запуска, секунд
+TIMEOUT = 120
+
+
+def measure_startup(command):
+    """Один запуск; секунды от старта процесса до первой отрисовки и до готовности"""
+    with tempfile.TemporaryDirectory() as tmp:
+        report_file = os.path.join(tmp, 'startup.json')
+        started = time.time()
+        subprocess.run(command + ['--startup-benchmark', report_file],
+                       timeout=TIMEOUT, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        with open(report_file, encoding='utf-8') as f:
+            report = json.load(f)
+    return {
+        'first_paint': round(report['first_paint'] - started, 3),
+        'ready': round(report['ready'] - started, 3),
+        'modules_at_first_paint': report['modules_at_first_paint'],
+    }
+
+
+def run_startup(command, repeat=5, on_result=None):
+    """repeat запусков; возвращает словарь для JSON с медианами"""
+    runs = []
+    for _ in range(repeat):
+        result = measure_startup(command)
+        runs.append(result)
+        if on_result:
+            on_result(result)
+    return {
+        **environment(),
+        'command': command,
+        'first_paint': statistics.median(run['first_paint'] for run in runs),
+        'ready': statistics.median(run['ready'] for run in runs),
+        'runs': runs,
+    }
+
+
+def format_result(result):
+    """Строка для вывода в консоль"""
+    heavy = ', '.join(result['modules_at_first_paint']) or 'нет'
+    return f"первая отрисовка {result['first_paint']:6.2f} с, " \
+           f"движок готов {result['ready']:6.2f} с, загружены к отрисовке: {heavy}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='benchmarks.startup',
+        description='Замер времени запуска конвертера до первой отрисовки окна'
+    )
+    parser.add_argument('--exe', help='собранный .exe (по умолчанию converter_app.py '
+                                      'текущим интерпретатором)')
+    parser.add_argument('--repeat', type=int, default=5, help='число запусков')
+    parser.add_argument('-o', '--output', help='файл JSON с результатами')
+    args = parser.parse_args(argv)
+
+    command = [args.exe] if args.exe else [sys.executable, APP_SCRIPT]
+    report = run_startup(command, args.repeat,
+                         on_result=lambda result: print(format_result(result), flush=True))
+    print(f"Медиана: первая отрисовка {report['first_paint']:.2f} с, "
+          f"движок готов {report['ready']:.2f} с")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Результаты: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,26 +18,33 @@ def check_environment():
     except Exception as e:
         print(f"   ❌ Ошибка: {e}")
     
-    print("\n5. Проверка openpyxl:")
+    print("\n5. Проверка chardet:")
     try:
-        import openpyxl
-        print(f"   ✅ openpyxl версия: {openpyxl.__version__}")
+        import chardet
+        print(f"   ✅ chardet версия: {chardet.__version__}")
     except Exception as e:
         print(f"   ❌ Ошибка: {e}")
     
-    print("\n6. Проверка chardet:")
+    print("\n6. Проверка xlsxwriter:")
     try:
-        import chardet
-        print(f"   ✅ chardet версия: {chardet.__version__}")
+        import xlsxwriter
+        print(f"   ✅ xlsxwriter версия: {xlsxwriter.__version__}")
+    except Exception as e:
+        print(f"   ❌ Ошибка: {e}")
+    
+    print("\n7. Проверка pyarrow (Parquet и Feather):")
+    try:
+        import pyarrow
+        print(f"   ✅ pyarrow версия: {pyarrow.__version__}")
     except Exception as e:
         print(f"   ❌ Ошибка: {e}")
     
-    print("\n7. Проверка PATH:")
+    print("\n8. Проверка PATH:")
     paths = sys.path[:10]  # Первые 10 путей
     for i, path in enumerate(paths, 1):
         print(f"   {i}. {path}")
     
-    print("\n8. Переменные окружения:")
+    print("\n9. Переменные окружения:")
     print(f"   PYTHONPATH: {os.environ.get('PYTHONPATH', 'не установлен')}")
     
     print("\n" + "="*60)
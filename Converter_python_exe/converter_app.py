@@ -1,161 +1,326 @@
 import sys
 import os
-import pandas as pd
+import json
+import time
+import threading
+import multiprocessing
+import importlib.util
 from datetime import datetime
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QLineEdit, QPushButton, QFileDialog, QMessageBox,
-    QGroupBox, QRadioButton, QButtonGroup, QProgressBar, QTextEdit
+    QGroupBox, QRadioButton, QButtonGroup, QProgressBar, QTextEdit, QCheckBox,
+    QTableView, QHeaderView, QSpinBox
 )
-from PySide6.QtCore import Qt, QThread, Signal
+from PySide6.QtCore import Qt, QThread, Signal, QAbstractTableModel, QModelIndex
 from PySide6.QtGui import QFont, QPalette, QColor
 
+# converter_engine и converter_batch тянут pandas и numpy, поэтому они
+# импортируются не здесь, а в фоне после первой отрисовки окна (WarmUpThread)
+# или по месту использования
+import converter_profile
+import converter_encoding
+
+# Модули, которых не должно быть в памяти к первой отрисовке окна
+HEAVY_MODULES = ('pandas', 'numpy', 'xlsxwriter', 'pyarrow')
+
+# Меньше точек на угол графики не строятся (converter_chart.ChartSeries;
+# модуль тянет numpy, поэтому здесь не импортируется)
+MIN_CHART_POINTS = 3
+
+# Цвета форматов: основной, при наведении, при нажатии
+FORMAT_COLORS = {
+    'xlsx': ('#3498db', '#2e86c1', '#1a5276'),
+    'csv': ('#4CAF50', '#45a049', '#3a5c42'),
+    'parquet': ('#e67e22', '#ca6f1e', '#935116'),
+    'feather': ('#9b59b6', '#884ea0', '#5b2c6f'),
+}
+
+class WarmUpThread(QThread):
+    """Фоновый импорт движка (pandas, numpy) и xlsxwriter после показа окна,
+    чтобы первая конвертация не ждала импорта"""
+    
+    def run(self):
+        try:
+            import converter_engine
+            import converter_batch
+            import xlsxwriter
+        except ImportError:
+            # Сообщение об ошибке покажет сама конвертация
+            pass
+
+class PreviewIndexThread(QThread):
+    """Построение разреженного индекса строк для предпросмотра"""
+    indexed = Signal(int)
+    
+    def __init__(self, reader):
+        super().__init__()
+        self.reader = reader
+    
+    def run(self):
+        for lines in self.reader.index.build():
+            self.indexed.emit(lines)
+            if self.isInterruptionRequested():
+                return
+
+class PreviewModel(QAbstractTableModel):
+    """Строки исходного файла для QTableView, читаются по мере прокрутки.
+    
+    Значения разобраны так же, как при конвертации; строки, которые
+    будут пропущены, показываются серым исходным текстом.
+    """
+    
+    def __init__(self, reader, columns):
+        super().__init__()
+        self.reader = reader
+        self.columns = columns
+        self.rows = 0
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.rows
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            parts, text = self.reader.row(index.row())
+            if parts is None:
+                return text if index.column() == 0 else None
+            return parts[index.column()]
+        if role == Qt.ForegroundRole:
+            parts, _ = self.reader.row(index.row())
+            return QColor("#777") if parts is None else None
+        if role == Qt.ToolTipRole:
+            parts, text = self.reader.row(index.row())
+            return f"Пропускается при конвертации:\n{text}" if parts is None else None
+        return None
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.columns[section]
+        # Номер строки исходного файла
+        return str(section + 1)
+    
+    def extend(self, lines):
+        """Добавляет строки, проиндексированные в фоне"""
+        if lines > self.rows:
+            self.beginInsertRows(QModelIndex(), self.rows, lines - 1)
+            self.rows = lines
+            self.endInsertRows()
+
 class ConverterThread(QThread):
     """Поток для выполнения конвертации"""
-    progress = Signal(int)
+    progress = Signal(object)
     message = Signal(str)
     finished = Signal(bool, str)
     
-    def __init__(self, input_file, output_file, is_xlsx):
+    def __init__(self, input_file, output_file, output_format, xlsx_numbers=False,
+                 timings_log=None, profile_file=None, checkpoint=False, bucket_ms=None,
+                 start_ms=None, end_ms=None, summary=False, episodes=False,
+                 chart_points=None):
         super().__init__()
         self.input_file = input_file
         self.output_file = output_file
-        self.is_xlsx = is_xlsx
+        self.output_format = output_format
+        self.xlsx_numbers = xlsx_numbers
+        # Журнал замеров по этапам (JSON Lines) и файл статистики cProfile
+        self.timings_log = timings_log
+        self.profile_file = profile_file
+        # Контрольные точки для продолжения прерванной конвертации (CSV)
+        self.checkpoint = checkpoint
+        # Ширина интервала прореживания по Time_ms (None — все отсчеты)
+        self.bucket_ms = bucket_ms
+        # Окно Time_ms (None - без границы)
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        # Сводная статистика (JSON рядом с результатом, лист Summary в XLSX)
+        self.summary = summary
+        # Эпизоды флагов (лист Episodes в XLSX, иначе .episodes.csv)
+        self.episodes = episodes
+        # Точек графика на угол (лист Charts в XLSX), None - без графиков
+        self.chart_points = chart_points
+        self.cancel_event = threading.Event()
+    
+    def cancel(self):
+        """Просит движок остановиться после текущего блока"""
+        self.cancel_event.set()
     
     def run(self):
         try:
+            import converter_engine
             self.message.emit("Начало обработки файла...")
             
-            # Читаем и обрабатываем данные
-            data = []
-            total_lines = 0
-            
-            # Считаем количество строк для прогресса
-            with open(self.input_file, 'r', encoding='utf-8') as f:
-                for _ in f:
-                    total_lines += 1
-            
-            if total_lines == 0:
-                self.finished.emit(False, "Файл пуст")
-                return
-            
-            self.message.emit(f"Найдено строк: {total_lines}")
-            
-            processed = 0
-            with open(self.input_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#'):
-                        parts = line.split(';')
-                        if len(parts) >= 6:
-                            # Обработка чисел
-                            for i in range(len(parts)):
-                                if i == 0:  # Time_ms
-                                    parts[i] = self.remove_leading_zeros(parts[i])
-                                elif 1 <= i <= 3:  # PITCH, ROLL, YAW
-                                    parts[i] = parts[i].replace('.', ',')
-                                    parts[i] = self.remove_leading_zeros_decimal(parts[i])
-                            
-                            data.append(parts[:6])
-                    
-                    processed += 1
-                    progress = int((processed / total_lines) * 100)
-                    self.progress.emit(progress)
-            
-            if not data:
-                self.finished.emit(False, "Нет данных для обработки")
-                return
+            if self.profile_file:
+                with converter_profile.profile_run(self.profile_file):
+                    result = self.convert()
+            else:
+                result = self.convert()
             
-            self.message.emit("Создание DataFrame...")
-            df = pd.DataFrame(data, columns=['Time_ms', 'PITCH', 'ROLL', 'YAW', 'Dizziness', 'Nystagmus'])
+            if self.timings_log:
+                converter_profile.append_log(
+                    self.timings_log, result.timings,
+                    input_file=os.path.abspath(self.input_file),
+                    output_format=self.output_format, rows=result.rows
+                )
             
-            if self.is_xlsx:
-                self.message.emit("Сохранение в XLSX...")
-                with pd.ExcelWriter(self.output_file, engine='openpyxl') as writer:
-                    df.to_excel(writer, index=False, sheet_name='Data')
-                    
-                    workbook = writer.book
-                    worksheet = writer.sheets['Data']
-                    
-                    from openpyxl.styles import Font, Alignment, PatternFill
-                    from openpyxl.utils import get_column_letter
-                    
-                    header_fill = PatternFill(start_color='DCE6F1', end_color='DCE6F1', fill_type='solid')
-                    header_font = Font(bold=True, size=12)
-                    header_alignment = Alignment(horizontal='center', vertical='center')
-                    
-                    for col in range(1, len(df.columns) + 1):
-                        cell = worksheet.cell(row=1, column=col)
-                        cell.fill = header_fill
-                        cell.font = header_font
-                        cell.alignment = header_alignment
-                        
-                        column_letter = get_column_letter(col)
-                        worksheet.column_dimensions[column_letter].auto_size = True
-                
-                file_size = os.path.getsize(self.output_file)
+            if self.output_format == 'xlsx':
                 message = f"✅ ФАЙЛ УСПЕШНО ПРЕОБРАЗОВАН!\n\n" \
-                         f"Сохранен как: {os.path.basename(self.output_file)}\n" \
-                         f"Размер: {file_size:,} байт\n" \
-                         f"Строк данных: {len(data)}\n\n" \
+                         f"{self.describe_parts(result)}" \
+                         f"Размер: {result.file_size:,} байт\n" \
+                         f"Строк данных: {result.rows}\n" \
+                         f"Пропущено строк: {result.skipped}\n\n" \
                          f"Файл готов к открытию в Microsoft Excel."
             
+            elif self.output_format in ('parquet', 'feather'):
+                message = f"✅ ФАЙЛ УСПЕШНО ПРЕОБРАЗОВАН!\n\n" \
+                         f"{self.describe_parts(result)}" \
+                         f"Размер: {result.file_size:,} байт\n" \
+                         f"Строк данных: {result.rows}\n" \
+                         f"Пропущено строк: {result.skipped}\n\n" \
+                         f"Загрузка в pandas:\n" \
+                         f"pandas.read_{self.output_format}(\"{os.path.basename(self.output_file)}\")"
+            
             else:
-                self.message.emit("Сохранение в CSV...")
-                df.to_csv(self.output_file, sep=';', index=False, encoding='utf-8-sig')
-                
-                file_size = os.path.getsize(self.output_file)
                 message = f"✅ ФАЙЛ УСПЕШНО ПРЕОБРАЗОВАН!\n\n" \
-                         f"Сохранен как: {os.path.basename(self.output_file)}\n" \
-                         f"Размер: {file_size:,} байт\n" \
-                         f"Строк данных: {len(data)}\n\n" \
+                         f"{self.describe_parts(result)}" \
+                         f"Размер: {result.file_size:,} байт\n" \
+                         f"Строк данных: {result.rows}\n" \
+                         f"Пропущено строк: {result.skipped}\n\n" \
                          f"При открытии в Excel:\n" \
                          f"1. Выберите 'Все файлы (*.*)'\n" \
                          f"2. Укажите кодировку UTF-8\n" \
                          f"3. Выберите разделитель ';'"
             
+            message += "\n\nВремя по этапам:\n" + "\n".join(
+                f"  {line}" for line in converter_profile.format_timings(result.timings)
+            )
+            if result.summary is not None:
+                import converter_summary
+                summary_file = converter_summary.summary_path(self.output_file)
+                message += f"\n\nСводка: {os.path.basename(summary_file)}"
+            if result.episodes is not None:
+                if self.output_format == 'xlsx':
+                    message += f"\n\nЭпизодов флагов: {result.episodes} (лист Episodes)"
+                else:
+                    import converter_episodes
+                    episodes_file = converter_episodes.episodes_path(self.output_file)
+                    message += f"\n\nЭпизодов флагов: {result.episodes} " \
+                               f"({os.path.basename(episodes_file)})"
+            if self.profile_file:
+                message += f"\n\nПрофиль: {os.path.basename(self.profile_file)}"
+            
             self.finished.emit(True, message)
             
         except Exception as e:
-            error_msg = f"Ошибка при конвертации:\n{str(e)}"
-            self.finished.emit(False, error_msg)
+            # Если движок не загрузился (нет pandas), ConversionError
+            # взять неоткуда; сообщение тогда общее
+            engine = sys.modules.get('converter_engine')
+            if engine is not None and isinstance(e, engine.ConversionError):
+                self.finished.emit(False, str(e))
+            else:
+                error_msg = f"Ошибка при конвертации:\n{str(e)}"
+                self.finished.emit(False, error_msg)
     
-    def remove_leading_zeros(self, s):
-        if not s:
-            return s
-        while len(s) > 1 and s.startswith('0') and not s.startswith('0.'):
-            s = s[1:]
-        return s
-    
-    def remove_leading_zeros_decimal(self, s):
-        if not s:
-            return s
-        
-        is_negative = False
-        if s.startswith('-'):
-            is_negative = True
-            s = s[1:]
-        
-        if '.' in s or ',' in s:
-            separator = '.' if '.' in s else ','
-            parts = s.split(separator)
+    def convert(self):
+        import converter_engine
+        return converter_engine.convert(
+            self.input_file, self.output_file, self.output_format,
+            on_progress=self.progress.emit,
+            on_message=self.message.emit,
+            xlsx_numbers=self.xlsx_numbers,
+            # Большие файлы разбираются на всех ядрах
+            workers=os.cpu_count() or 1,
+            cancel=self.cancel_event,
+            checkpoint=self.checkpoint,
+            bucket_ms=self.bucket_ms,
+            start_ms=self.start_ms,
+            end_ms=self.end_ms,
+            summary=self.summary,
+            episodes=self.episodes,
+            chart_points=self.chart_points
+        )
+    
+    def describe_parts(self, result):
+        """Список созданных файлов и листов для сообщения об успехе"""
+        if len(result.output_files) > 1:
+            names = "\n".join(f"  {os.path.basename(path)}" for path in result.output_files)
+            text = f"Превышен предел строк Excel, файл разбит на части:\n{names}\n"
+        else:
+            text = f"Сохранен как: {os.path.basename(self.output_file)}\n"
+        
+        if len(result.sheets) > 1:
+            text += f"Превышен предел строк Excel, данные разбиты на листы:\n" \
+                    f"  {', '.join(result.sheets)}\n"
+        return text
+
+class BatchThread(QThread):
+    """Поток для пакетной конвертации папки"""
+    progress = Signal(object)
+    file_progress = Signal(int, object)
+    file_done = Signal(int, object)
+    message = Signal(str)
+    finished = Signal(bool, str)
+    
+    def __init__(self, inputs, output_dir, output_format, xlsx_numbers=False,
+                 checkpoint=False, bucket_ms=None, start_ms=None, end_ms=None, summary=False,
+                 episodes=False, chart_points=None, skip_unchanged=False):
+        super().__init__()
+        self.inputs = inputs
+        self.output_dir = output_dir
+        self.output_format = output_format
+        self.xlsx_numbers = xlsx_numbers
+        self.checkpoint = checkpoint
+        self.bucket_ms = bucket_ms
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.summary = summary
+        self.episodes = episodes
+        self.chart_points = chart_points
+        # Не конвертировать файлы, не изменившиеся по манифесту папки
+        self.skip_unchanged = skip_unchanged
+        self.cancel_event = threading.Event()
+    
+    def cancel(self):
+        """Файлы в очереди не начинаются, текущие останавливаются после блока"""
+        self.cancel_event.set()
+    
+    def run(self):
+        try:
+            import converter_batch
+            self.message.emit(f"Начало обработки {len(self.inputs)} файлов...")
+            
+            batch = converter_batch.convert_batch(
+                self.inputs, self.output_dir, self.output_format,
+                on_progress=self.progress.emit,
+                on_file_progress=self.file_progress.emit,
+                on_file_done=self.file_done.emit,
+                skip_unchanged=self.skip_unchanged,
+                cancel=self.cancel_event,
+                xlsx_numbers=self.xlsx_numbers,
+                checkpoint=self.checkpoint,
+                bucket_ms=self.bucket_ms,
+                start_ms=self.start_ms,
+                end_ms=self.end_ms,
+                summary=self.summary,
+                episodes=self.episodes,
+                chart_points=self.chart_points
+            )
+            
+            message = f"{converter_batch.format_summary(batch)}\n\n" \
+                      f"Отчет: {os.path.basename(batch.report_file)}"
+            self.finished.emit(not batch.failed, message)
             
-            if len(parts) == 2:
-                integer_part = parts[0]
-                decimal_part = parts[1]
-                
-                while len(integer_part) > 1 and integer_part.startswith('0'):
-                    integer_part = integer_part[1:]
-                
-                s = integer_part + separator + decimal_part
-        
-        if is_negative:
-            s = '-' + s
-        
-        return s
+        except Exception as e:
+            error_msg = f"Ошибка при пакетной конвертации:\n{str(e)}"
+            self.finished.emit(False, error_msg)
 
 class ConverterApp(QMainWindow):
-    def __init__(self):
+    def __init__(self, startup_report=None):
         super().__init__()
         self.setWindowTitle("Конвертер txt в Excel v1.0")
         self.setGeometry(100, 100, 800, 500)
@@ -222,7 +387,52 @@ class ConverterApp(QMainWindow):
         self.browse_file_btn.setStyleSheet(self.get_button_style())
         file_row.addWidget(self.browse_file_btn)
         
+        # Пакетный режим: все .txt файлы выбранной папки
+        self.browse_folder_btn = QPushButton("📂 Папка")
+        self.browse_folder_btn.setFixedWidth(100)
+        self.browse_folder_btn.clicked.connect(self.browse_input_folder)
+        self.browse_folder_btn.setStyleSheet(self.get_button_style())
+        file_row.addWidget(self.browse_folder_btn)
+        
+        # Предпросмотр выбранного файла без конвертации
+        self.preview_btn = QPushButton("👁 Просмотр")
+        self.preview_btn.setFixedWidth(110)
+        self.preview_btn.setCheckable(True)
+        self.preview_btn.toggled.connect(self.toggle_preview)
+        self.preview_btn.setStyleSheet(self.get_button_style())
+        file_row.addWidget(self.preview_btn)
+        
         file_layout.addLayout(file_row)
+        
+        self.preview_label = QLabel()
+        self.preview_label.setStyleSheet("color: #aaa; font-size: 12px;")
+        self.preview_label.setVisible(False)
+        file_layout.addWidget(self.preview_label)
+        
+        self.preview_view = QTableView()
+        self.preview_view.setVisible(False)
+        self.preview_view.setMinimumHeight(220)
+        # Одинаковая высота строк: прокрутка миллионов строк без их измерения
+        self.preview_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.preview_view.verticalHeader().setDefaultSectionSize(22)
+        self.preview_view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.preview_view.setStyleSheet("""
+            QTableView {
+                background-color: #2a2a2a;
+                border: 1px solid #444;
+                color: #ddd;
+                gridline-color: #3a3a3a;
+                font-size: 12px;
+            }
+            QHeaderView::section {
+                background-color: #3c3c3c;
+                color: #aaa;
+                border: none;
+                padding: 3px;
+            }
+        """)
+        file_layout.addWidget(self.preview_view)
+        
         file_group.setLayout(file_layout)
         main_layout.addWidget(file_group)
         
@@ -243,28 +453,136 @@ class ConverterApp(QMainWindow):
             }
         """)
         
-        format_layout = QHBoxLayout()
+        format_layout = QVBoxLayout()
+        format_row = QHBoxLayout()
+        analytics_row = QHBoxLayout()
         
         # Создаем радиокнопки (XLSX выбран по умолчанию)
         self.xlsx_radio = QRadioButton("XLSX (нативный формат Excel)")
         self.csv_radio = QRadioButton("CSV (универсальный текстовый формат)")
+        self.parquet_radio = QRadioButton("Parquet (для анализа, сжатый)")
+        self.feather_radio = QRadioButton("Feather (Arrow IPC)")
         self.xlsx_radio.setChecked(True)  # XLSX выбран по умолчанию
         
+        # Parquet и Feather: типизированные столбцы для pandas и других инструментов
+        for radio in (self.parquet_radio, self.feather_radio):
+            radio.setToolTip(
+                "Time_ms - целые, углы - float32, флаги - uint8.\n"
+                "Загружается в pandas за доли секунды, сжатие zstd."
+            )
+        
+        self.format_radios = {
+            'xlsx': self.xlsx_radio,
+            'csv': self.csv_radio,
+            'parquet': self.parquet_radio,
+            'feather': self.feather_radio,
+        }
+        
         # Устанавливаем начальные стили для радиокнопок
         self.update_radio_styles()
         
         self.format_group = QButtonGroup()
-        self.format_group.addButton(self.xlsx_radio)
-        self.format_group.addButton(self.csv_radio)
+        for radio in self.format_radios.values():
+            self.format_group.addButton(radio)
+            # Подключаем сигналы изменения состояния
+            radio.toggled.connect(self.on_format_changed)
+        
+        format_row.addWidget(self.xlsx_radio)
+        format_row.addWidget(self.csv_radio)
+        format_row.addStretch()
+        analytics_row.addWidget(self.parquet_radio)
+        analytics_row.addWidget(self.feather_radio)
+        
+        # Прореживание: строка на интервал Time_ms вместо каждого отсчета
+        self.bucket_label = QLabel("Интервал:")
+        self.bucket_label.setStyleSheet("color: #aaa; font-size: 13px;")
+        self.bucket_spin = self.make_spin(
+            "все отсчеты",
+            "Одна строка на интервал Time_ms заданной ширины:\n"
+            "для углов среднее, минимум и максимум, для флагов максимум.\n"
+            "Например, 100 мс дают 10 строк в секунду.",
+            maximum=3600000, step=100
+        )
+        analytics_row.addWidget(self.bucket_label)
+        analytics_row.addWidget(self.bucket_spin)
         
-        # Подключаем сигналы изменения состояния
-        self.xlsx_radio.toggled.connect(self.on_format_changed)
-        self.csv_radio.toggled.connect(self.on_format_changed)
+        # Сводная статистика в том же проходе
+        self.summary_check = QCheckBox("Сводка")
+        self.summary_check.setToolTip(
+            "Число значений, минимум, максимум, среднее и отклонение углов,\n"
+            "длительность и частота записи, время с флагами.\n"
+            "Сохраняется в .summary.json рядом с результатом, в XLSX — на лист Summary."
+        )
+        self.summary_check.setStyleSheet("color: #aaa; font-size: 13px;")
+        analytics_row.addWidget(self.summary_check)
+        
+        # Эпизоды флагов: начало, конец, длительность каждой серии
+        self.episodes_check = QCheckBox("Эпизоды")
+        self.episodes_check.setToolTip(
+            "Таблица эпизодов Dizziness и Nystagmus: начало, конец,\n"
+            "длительность и число отсчетов каждой серии с флагом.\n"
+            "В XLSX — лист Episodes, в других форматах — файл .episodes.csv."
+        )
+        self.episodes_check.setStyleSheet("color: #aaa; font-size: 13px;")
+        analytics_row.addWidget(self.episodes_check)
+        analytics_row.addStretch()
+        
+        # Окно по времени: конвертируются только строки start <= Time_ms < end
+        window_row = QHBoxLayout()
+        window_tooltip = (
+            "Конвертируются только строки с Time_ms от начала (включительно)\n"
+            "до конца окна. Нужный участок файла находится по индексу,\n"
+            "который строится один раз и хранится рядом с исходным файлом."
+        )
+        self.window_label = QLabel("Окно Time_ms: от")
+        self.window_label.setStyleSheet("color: #aaa; font-size: 13px;")
+        self.window_start_spin = self.make_spin("начала файла", window_tooltip)
+        self.window_end_label = QLabel("до")
+        self.window_end_label.setStyleSheet("color: #aaa; font-size: 13px;")
+        self.window_end_spin = self.make_spin("конца файла", window_tooltip)
+        window_row.addWidget(self.window_label)
+        window_row.addWidget(self.window_start_spin)
+        window_row.addWidget(self.window_end_label)
+        window_row.addWidget(self.window_end_spin)
+        
+        # Графики углов в XLSX по ряду из заданного числа точек (LTTB);
+        # предел - converter_chart.MAX_POINTS
+        self.chart_label = QLabel("Графики:")
+        self.chart_label.setStyleSheet("color: #aaa; font-size: 13px;")
+        self.chart_spin = self.make_spin(
+            "без графиков",
+            "Графики PITCH, ROLL и YAW на листе Charts.\n"
+            "Строятся по ряду из заданного числа точек на угол (LTTB),\n"
+            "поэтому книга открывается сразу и на миллионах строк.",
+            maximum=32000, step=500, suffix=" точек"
+        )
+        self.chart_spin.setEnabled(self.xlsx_radio.isChecked())
+        window_row.addWidget(self.chart_label)
+        window_row.addWidget(self.chart_spin)
+        window_row.addStretch()
         
-        format_layout.addWidget(self.xlsx_radio)
-        format_layout.addWidget(self.csv_radio)
-        format_layout.addStretch()
+        # Числа в XLSX как числа (с числовым форматом), а не как текст
+        self.xlsx_numbers_check = QCheckBox("Числа как числа")
+        self.xlsx_numbers_check.setToolTip(
+            "Time_ms, углы и флаги сохраняются в XLSX числовыми ячейками.\n"
+            "Разделитель дробной части Excel покажет по региональным настройкам."
+        )
+        self.xlsx_numbers_check.setStyleSheet("color: #aaa; font-size: 13px;")
+        format_row.addWidget(self.xlsx_numbers_check)
         
+        # Продолжение прерванной конвертации (дописать можно только CSV)
+        self.checkpoint_check = QCheckBox("Контрольные точки")
+        self.checkpoint_check.setToolTip(
+            "При сбое или закрытии программы конвертация в CSV\n"
+            "продолжится с последней контрольной точки при следующем запуске."
+        )
+        self.checkpoint_check.setStyleSheet("color: #aaa; font-size: 13px;")
+        self.checkpoint_check.setEnabled(False)
+        format_row.addWidget(self.checkpoint_check)
+        
+        format_layout.addLayout(format_row)
+        format_layout.addLayout(analytics_row)
+        format_layout.addLayout(window_row)
         format_group.setLayout(format_layout)
         main_layout.addWidget(format_group)
         
@@ -330,6 +648,42 @@ class ConverterApp(QMainWindow):
         name_row.addWidget(self.output_name_edit, 1)
         
         output_layout.addLayout(name_row)
+        
+        # Пакетный режим: файлы, не изменившиеся с прошлого раза, не конвертируются
+        batch_row = QHBoxLayout()
+        self.skip_unchanged_check = QCheckBox("Пропускать неизмененные файлы")
+        self.skip_unchanged_check.setToolTip(
+            "При пакетной конвертации файлы, которые не изменились с прошлого\n"
+            "запуска с теми же параметрами, не конвертируются заново\n"
+            "(манифест в папке сохранения)."
+        )
+        self.skip_unchanged_check.setStyleSheet("color: #aaa; font-size: 13px;")
+        self.skip_unchanged_check.setChecked(True)
+        self.skip_unchanged_check.setEnabled(False)
+        batch_row.addWidget(self.skip_unchanged_check)
+        batch_row.addStretch()
+        output_layout.addLayout(batch_row)
+        
+        # Диагностика медленной конвертации
+        diagnostics_row = QHBoxLayout()
+        self.timings_log_check = QCheckBox("Журнал замеров")
+        self.timings_log_check.setToolTip(
+            f"Время и память по этапам дописываются в {converter_profile.TIMINGS_LOG}\n"
+            "в папке сохранения."
+        )
+        self.timings_log_check.setStyleSheet("color: #aaa; font-size: 13px;")
+        diagnostics_row.addWidget(self.timings_log_check)
+        
+        self.profile_check = QCheckBox("Профилирование (cProfile)")
+        self.profile_check.setToolTip(
+            "Статистика cProfile сохраняется рядом с результатом в файл .prof\n"
+            "(python -m pstats файл.prof). Конвертация идет медленнее."
+        )
+        self.profile_check.setStyleSheet("color: #aaa; font-size: 13px;")
+        diagnostics_row.addWidget(self.profile_check)
+        diagnostics_row.addStretch()
+        
+        output_layout.addLayout(diagnostics_row)
         output_group.setLayout(output_layout)
         main_layout.addWidget(output_group)
         
@@ -339,9 +693,17 @@ class ConverterApp(QMainWindow):
         self.convert_btn.setFont(QFont("Arial", 12, QFont.Bold))
         self.convert_btn.clicked.connect(self.start_conversion)
         self.convert_btn.setEnabled(False)
-        self.convert_btn.setStyleSheet(self.get_convert_button_style(True))  # XLSX стиль по умолчанию
+        self.convert_btn.setStyleSheet(self.get_convert_button_style('xlsx'))  # XLSX стиль по умолчанию
         main_layout.addWidget(self.convert_btn, alignment=Qt.AlignCenter)
         
+        # === КНОПКА ОТМЕНЫ (видна во время конвертации) ===
+        self.cancel_btn = QPushButton("⏹ Отмена")
+        self.cancel_btn.setFixedSize(150, 35)
+        self.cancel_btn.clicked.connect(self.cancel_conversion)
+        self.cancel_btn.setStyleSheet(self.get_button_style())
+        self.cancel_btn.setVisible(False)
+        main_layout.addWidget(self.cancel_btn, alignment=Qt.AlignCenter)
+        
         # === ПРОГРЕСС БАР ===
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
@@ -365,6 +727,21 @@ class ConverterApp(QMainWindow):
         self.status_label.setStyleSheet("color: #aaa; font-size: 14px;")
         main_layout.addWidget(self.status_label)
         
+        # === ЖУРНАЛ ПАКЕТНОЙ КОНВЕРТАЦИИ ===
+        self.batch_log = QTextEdit()
+        self.batch_log.setReadOnly(True)
+        self.batch_log.setVisible(False)
+        self.batch_log.setStyleSheet("""
+            QTextEdit {
+                background-color: #2a2a2a;
+                border: 1px solid #444;
+                border-radius: 3px;
+                color: #ccc;
+                font-size: 12px;
+            }
+        """)
+        main_layout.addWidget(self.batch_log)
+        
         # === ИНФОРМАЦИЯ О ПРОГРАММЕ ===
         info_label = QLabel("© 2026 Конвертер txt в Excel v1.0")
         info_label.setAlignment(Qt.AlignCenter)
@@ -374,11 +751,48 @@ class ConverterApp(QMainWindow):
         # Инициализируем переменную для хранения базового имени файла
         self.base_file_name = ""
         
-        # Подключаем сигналы изменения формата
-        self.xlsx_radio.toggled.connect(self.update_file_extension)
-        self.csv_radio.toggled.connect(self.update_file_extension)
+        # Список входных файлов пакетного режима (пустой - обычный режим)
+        self.batch_inputs = []
+        self.batch_active = {}
         
         self.converter_thread = None
+        
+        # Предпросмотр: модель таблицы и поток построения индекса
+        self.preview_model = None
+        self.preview_thread = None
+        
+        # Фоновый импорт тяжелых модулей стартует после первой отрисовки
+        self.warm_up_thread = None
+        # Файл для замера времени запуска (benchmarks.startup)
+        self.startup_report = startup_report
+        self.first_paint_time = None
+        self.modules_at_first_paint = []
+    
+    def closeEvent(self, event):
+        self.stop_preview()
+        super().closeEvent(event)
+    
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.warm_up_thread is None:
+            self.first_paint_time = time.time()
+            self.modules_at_first_paint = [name for name in HEAVY_MODULES
+                                           if name in sys.modules]
+            self.warm_up_thread = WarmUpThread()
+            self.warm_up_thread.finished.connect(self.warm_up_finished)
+            self.warm_up_thread.start()
+    
+    def warm_up_finished(self):
+        """Движок загружен; при замере запуска записывает отчет и закрывает окно"""
+        if not self.startup_report:
+            return
+        with open(self.startup_report, 'w', encoding='utf-8') as f:
+            json.dump({
+                'first_paint': self.first_paint_time,
+                'ready': time.time(),
+                'modules_at_first_paint': self.modules_at_first_paint,
+            }, f)
+        QApplication.quit()
     
     def setup_dark_theme(self):
         """Настройка темной темы"""
@@ -399,6 +813,45 @@ class ConverterApp(QMainWindow):
         
         self.setPalette(palette)
     
+    def make_spin(self, special_text, tooltip, maximum=2147483647, step=1000, suffix=" мс"):
+        """Поле целого значения (по умолчанию в миллисекундах);
+        0 показывается как special_text"""
+        spin = QSpinBox()
+        spin.setRange(0, maximum)
+        spin.setSingleStep(step)
+        spin.setSuffix(suffix)
+        spin.setSpecialValueText(special_text)
+        spin.setToolTip(tooltip)
+        spin.setStyleSheet("""
+            QSpinBox {
+                background-color: #3c3c3c;
+                border: 1px solid #555;
+                border-radius: 3px;
+                padding: 3px;
+                color: white;
+            }
+        """)
+        return spin
+    
+    def time_window(self):
+        """Границы окна Time_ms из полей (None - без границы)"""
+        return self.window_start_spin.value() or None, self.window_end_spin.value() or None
+    
+    def chart_points(self, output_format):
+        """Точек графика на угол; None - без графиков (0 или формат не XLSX)"""
+        if output_format != 'xlsx':
+            return None
+        return self.chart_spin.value() or None
+    
+    def check_chart_points(self, output_format):
+        """Проверка числа точек графика перед запуском (с сообщением об ошибке)"""
+        points = self.chart_points(output_format)
+        if points is not None and points < MIN_CHART_POINTS:
+            QMessageBox.critical(self, "Ошибка",
+                                 f"Для графиков нужно не меньше {MIN_CHART_POINTS} точек!")
+            return False
+        return True
+    
     def get_button_style(self, hover_color="#505050", pressed_color="#303030"):
         """Стиль для обычных кнопок"""
         return f"""
@@ -422,160 +875,106 @@ class ConverterApp(QMainWindow):
             }}
         """
     
-    def get_convert_button_style(self, is_xlsx):
-        """Стиль для кнопки преобразования (одинаковая ширина для обоих вариантов)"""
-        if is_xlsx:
-            return """
-                QPushButton {
-                    background-color: #3498db;
-                    color: white;
-                    border: none;
-                    border-radius: 6px;
-                    padding: 12px 20px;
-                    font-weight: bold;
-                    min-width: 300px;
-                }
-                QPushButton:hover {
-                    background-color: #2e86c1;
-                }
-                QPushButton:pressed {
-                    background-color: #1a5276;
-                }
-                QPushButton:disabled {
-                    background-color: #555;
-                    color: #888;
-                }
-            """
-        else:
-            return """
-                QPushButton {
-                    background-color: #4CAF50;
-                    color: white;
-                    border: none;
-                    border-radius: 6px;
-                    padding: 12px 20px;
-                    font-weight: bold;
-                    min-width: 300px;
-                }
-                QPushButton:hover {
-                    background-color: #45a049;
-                }
-                QPushButton:pressed {
-                    background-color: #3a5c42;
-                }
-                QPushButton:disabled {
-                    background-color: #555;
-                    color: #888;
-                }
-            """
+    def selected_format(self):
+        """Выбранный формат выходного файла (ключ converter_engine.FORMATS)"""
+        for output_format, radio in self.format_radios.items():
+            if radio.isChecked():
+                return output_format
+        return 'xlsx'
+    
+    def get_convert_button_style(self, output_format):
+        """Стиль для кнопки преобразования (одинаковая ширина для всех форматов)"""
+        color, hover_color, pressed_color = FORMAT_COLORS[output_format]
+        return f"""
+            QPushButton {{
+                background-color: {color};
+                color: white;
+                border: none;
+                border-radius: 6px;
+                padding: 12px 20px;
+                font-weight: bold;
+                min-width: 300px;
+            }}
+            QPushButton:hover {{
+                background-color: {hover_color};
+            }}
+            QPushButton:pressed {{
+                background-color: {pressed_color};
+            }}
+            QPushButton:disabled {{
+                background-color: #555;
+                color: #888;
+            }}
+        """
     
     def update_radio_styles(self):
-        """Обновляет стили радиокнопок в зависимости от выбранной"""
-        if self.xlsx_radio.isChecked():
-            # XLSX выбран - синий
-            self.xlsx_radio.setStyleSheet("""
-                QRadioButton {
-                    color: #3498db;
-                    font-weight: bold;
-                    font-size: 13px;
-                }
-                QRadioButton::indicator {
-                    width: 16px;
-                    height: 16px;
-                }
-                QRadioButton::indicator:checked {
-                    background-color: #3498db;
-                    border: 3px solid #3498db;
-                    border-radius: 8px;
-                }
-                QRadioButton::indicator:unchecked {
-                    border: 2px solid #666;
-                    border-radius: 8px;
-                    background-color: #2a2a2a;
-                }
-            """)
-            
-            # CSV не выбран - серый
-            self.csv_radio.setStyleSheet("""
-                QRadioButton {
-                    color: #888;
-                    font-size: 13px;
-                }
-                QRadioButton::indicator {
-                    width: 16px;
-                    height: 16px;
-                }
-                QRadioButton::indicator:checked {
-                    background-color: #666;
-                    border: 3px solid #666;
-                    border-radius: 8px;
-                }
-                QRadioButton::indicator:unchecked {
-                    border: 2px solid #555;
-                    border-radius: 8px;
-                    background-color: #2a2a2a;
-                }
-            """)
-        else:
-            # CSV выбран - зеленый
-            self.csv_radio.setStyleSheet("""
-                QRadioButton {
-                    color: #4CAF50;
-                    font-weight: bold;
-                    font-size: 13px;
-                }
-                QRadioButton::indicator {
-                    width: 16px;
-                    height: 16px;
-                }
-                QRadioButton::indicator:checked {
-                    background-color: #4CAF50;
-                    border: 3px solid #4CAF50;
-                    border-radius: 8px;
-                }
-                QRadioButton::indicator:unchecked {
-                    border: 2px solid #666;
-                    border-radius: 8px;
-                    background-color: #2a2a2a;
-                }
-            """)
-            
-            # XLSX не выбран - серый
-            self.xlsx_radio.setStyleSheet("""
-                QRadioButton {
-                    color: #888;
-                    font-size: 13px;
-                }
-                QRadioButton::indicator {
-                    width: 16px;
-                    height: 16px;
-                }
-                QRadioButton::indicator:checked {
-                    background-color: #666;
-                    border: 3px solid #666;
-                    border-radius: 8px;
-                }
-                QRadioButton::indicator:unchecked {
-                    border: 2px solid #555;
-                    border-radius: 8px;
-                    background-color: #2a2a2a;
-                }
-            """)
+        """Обновляет стили радиокнопок: выбранная - цветом формата, остальные - серые"""
+        for output_format, radio in self.format_radios.items():
+            if radio.isChecked():
+                color = FORMAT_COLORS[output_format][0]
+                radio.setStyleSheet(f"""
+                    QRadioButton {{
+                        color: {color};
+                        font-weight: bold;
+                        font-size: 13px;
+                    }}
+                    QRadioButton::indicator {{
+                        width: 16px;
+                        height: 16px;
+                    }}
+                    QRadioButton::indicator:checked {{
+                        background-color: {color};
+                        border: 3px solid {color};
+                        border-radius: 8px;
+                    }}
+                    QRadioButton::indicator:unchecked {{
+                        border: 2px solid #666;
+                        border-radius: 8px;
+                        background-color: #2a2a2a;
+                    }}
+                """)
+            else:
+                radio.setStyleSheet("""
+                    QRadioButton {
+                        color: #888;
+                        font-size: 13px;
+                    }
+                    QRadioButton::indicator {
+                        width: 16px;
+                        height: 16px;
+                    }
+                    QRadioButton::indicator:checked {
+                        background-color: #666;
+                        border: 3px solid #666;
+                        border-radius: 8px;
+                    }
+                    QRadioButton::indicator:unchecked {
+                        border: 2px solid #555;
+                        border-radius: 8px;
+                        background-color: #2a2a2a;
+                    }
+                """)
     
     def on_format_changed(self):
         """Вызывается при изменении формата"""
+        # Сигнал toggled приходит и от снятой радиокнопки
+        if not self.sender() or not self.sender().isChecked():
+            return
+        
         # Обновляем стили радиокнопок
         self.update_radio_styles()
         
         # Обновляем стиль кнопки преобразования
-        is_xlsx = self.xlsx_radio.isChecked()
-        self.convert_btn.setStyleSheet(self.get_convert_button_style(is_xlsx))
+        output_format = self.selected_format()
+        self.convert_btn.setStyleSheet(self.get_convert_button_style(output_format))
+        
+        # Числовые ячейки есть только в XLSX, дописывать можно только CSV
+        self.xlsx_numbers_check.setEnabled(output_format == 'xlsx')
+        self.checkpoint_check.setEnabled(output_format == 'csv')
+        self.chart_spin.setEnabled(output_format == 'xlsx')
         
         # Обновляем текст кнопки (без эмодзи ракеты)
-        if is_xlsx:
-            self.convert_btn.setText("ПРЕОБРАЗОВАТЬ В XLSX")
-        else:
-            self.convert_btn.setText("ПРЕОБРАЗОВАТЬ В CSV")
+        self.convert_btn.setText(f"ПРЕОБРАЗОВАТЬ В {output_format.upper()}")
         
         # Обновляем расширение файла если имя уже задано
         self.update_file_extension()
@@ -588,6 +987,7 @@ class ConverterApp(QMainWindow):
         )
         
         if file_name:
+            self.set_batch_mode([])
             self.input_file_edit.setText(file_name)
             
             # Сохраняем путь к папке и базовое имя файла
@@ -603,16 +1003,125 @@ class ConverterApp(QMainWindow):
             # Устанавливаем папку сохранения (та же что и у исходного файла)
             self.output_dir_edit.setText(dir_path)
             
+            # Открытый предпросмотр переключается на новый файл
+            if self.preview_btn.isChecked():
+                self.load_preview()
+            
             # Устанавливаем имя выходного файла с правильным расширением
             self.update_file_extension()
             
             # Проверяем, можно ли активировать кнопку преобразования
             self.check_convert_button()
             
-            # Обновляем статус
-            self.status_label.setText(f"Выбран файл: {full_name}")
+            # Обновляем статус; кодировка определяется по выборке
+            # и запоминается до изменения файла, конвертация ее не повторяет
+            status = f"Выбран файл: {full_name}"
+            try:
+                detected = converter_encoding.detect_encoding(file_name)
+            except OSError:
+                detected = None
+            if detected and detected.method not in ('ascii', 'utf-8'):
+                status += f"\nКодировка: {converter_encoding.describe_encoding(detected)}"
+            self.status_label.setText(status)
             self.status_label.setStyleSheet("color: #aaa; font-size: 14px;")
     
+    def browse_input_folder(self):
+        """Выбор папки с файлами .txt для пакетной конвертации"""
+        dir_path = QFileDialog.getExistingDirectory(
+            self, "Выберите папку с текстовыми файлами", ""
+        )
+        
+        if not dir_path:
+            return
+        
+        import converter_batch
+        inputs = converter_batch.collect_inputs(dir_path)
+        if not inputs:
+            QMessageBox.warning(self, "Предупреждение", "В папке нет файлов .txt")
+            return
+        
+        self.set_batch_mode(inputs)
+        self.input_file_edit.setText(dir_path)
+        self.output_dir_edit.setText(os.path.join(dir_path, "converted"))
+        self.update_file_extension()
+        self.check_convert_button()
+        
+        self.status_label.setText(f"Выбрана папка: {len(inputs)} файлов .txt")
+        self.status_label.setStyleSheet("color: #aaa; font-size: 14px;")
+    
+    def toggle_preview(self, checked):
+        """Показывает или скрывает предпросмотр выбранного файла"""
+        self.preview_label.setVisible(checked)
+        self.preview_view.setVisible(checked)
+        if checked:
+            self.load_preview()
+        else:
+            self.stop_preview()
+    
+    def stop_preview(self):
+        """Останавливает индексацию и освобождает модель предпросмотра"""
+        if self.preview_thread is not None:
+            self.preview_thread.requestInterruption()
+            self.preview_thread.wait()
+            self.preview_thread = None
+        self.preview_view.setModel(None)
+        self.preview_model = None
+    
+    def load_preview(self):
+        """Предпросмотр текущего входного файла: строки читаются по мере прокрутки"""
+        import converter_engine
+        import converter_preview
+        self.stop_preview()
+        
+        input_file = self.input_file_edit.text()
+        if self.batch_inputs or not os.path.isfile(input_file):
+            self.preview_label.setText("Выберите файл .txt для предпросмотра")
+            return
+        
+        try:
+            reader = converter_preview.PreviewReader.open(input_file)
+        except (OSError, converter_engine.ConversionError) as e:
+            self.preview_label.setText(f"Предпросмотр недоступен: {e}")
+            return
+        
+        self.preview_model = PreviewModel(reader, converter_engine.COLUMNS)
+        self.preview_view.setModel(self.preview_model)
+        self.preview_label.setText("Индексация строк...")
+        
+        self.preview_thread = PreviewIndexThread(reader)
+        self.preview_thread.indexed.connect(self.preview_indexed)
+        self.preview_thread.finished.connect(self.preview_index_finished)
+        self.preview_thread.start()
+    
+    def preview_indexed(self, lines):
+        if self.preview_model is None:
+            return
+        self.preview_model.extend(lines)
+        self.preview_label.setText(f"Строк: {lines:,} (индексация...)")
+    
+    def preview_index_finished(self):
+        if self.preview_model is None or not self.preview_model.reader.index.done:
+            return
+        self.preview_label.setText(
+            f"Строк: {self.preview_model.rows:,} · "
+            f"кодировка {self.preview_model.reader.encoding} · "
+            f"серым — строки, которые будут пропущены"
+        )
+    
+    def set_batch_mode(self, inputs):
+        """Переключение между одиночным и пакетным режимом"""
+        self.batch_inputs = inputs
+        self.output_name_edit.setReadOnly(bool(inputs))
+        self.preview_btn.setEnabled(not inputs)
+        self.skip_unchanged_check.setEnabled(bool(inputs))
+        if inputs:
+            self.preview_btn.setChecked(False)
+        if inputs:
+            self.base_file_name = "*"
+        elif self.base_file_name == "*":
+            self.base_file_name = ""
+            self.output_name_edit.clear()
+    
     def browse_output_dir(self):
         """Выбор папки для сохранения"""
         dir_path = QFileDialog.getExistingDirectory(
@@ -629,10 +1138,9 @@ class ConverterApp(QMainWindow):
             return
         
         # Определяем расширение в зависимости от выбранного формата
-        if self.xlsx_radio.isChecked():
-            extension = ".xlsx"
-        else:
-            extension = ".csv"
+        output_format = self.selected_format()
+        import converter_engine
+        extension = converter_engine.FORMATS[output_format]
         
         # Формируем полное имя файла
         new_name = self.base_file_name + extension
@@ -641,28 +1149,17 @@ class ConverterApp(QMainWindow):
         self.output_name_edit.setText(new_name)
         
         # Обновляем цвет текста в зависимости от формата
-        if self.xlsx_radio.isChecked():
-            self.output_name_edit.setStyleSheet("""
-                QLineEdit {
-                    background-color: #3c3c3c;
-                    border: 1px solid #3498db;
-                    border-radius: 3px;
-                    padding: 5px;
-                    color: #3498db;
-                    font-weight: bold;
-                }
-            """)
-        else:
-            self.output_name_edit.setStyleSheet("""
-                QLineEdit {
-                    background-color: #3c3c3c;
-                    border: 1px solid #4CAF50;
-                    border-radius: 3px;
-                    padding: 5px;
-                    color: #4CAF50;
-                    font-weight: bold;
-                }
-            """)
+        color = FORMAT_COLORS[output_format][0]
+        self.output_name_edit.setStyleSheet(f"""
+            QLineEdit {{
+                background-color: #3c3c3c;
+                border: 1px solid {color};
+                border-radius: 3px;
+                padding: 5px;
+                color: {color};
+                font-weight: bold;
+            }}
+        """)
     
     def check_convert_button(self):
         """Активация кнопки преобразования при заполнении всех полей"""
@@ -674,10 +1171,20 @@ class ConverterApp(QMainWindow):
     
     def start_conversion(self):
         """Запуск процесса конвертации"""
+        if self.batch_inputs:
+            self.start_batch_conversion()
+            return
+        
         input_file = self.input_file_edit.text()
         output_dir = self.output_dir_edit.text()
         output_name = self.output_name_edit.text()
-        is_xlsx = self.xlsx_radio.isChecked()
+        output_format = self.selected_format()
+        start_ms, end_ms = self.time_window()
+        if start_ms is not None and end_ms is not None and start_ms >= end_ms:
+            QMessageBox.critical(self, "Ошибка", "Начало окна Time_ms должно быть меньше конца!")
+            return
+        if not self.check_chart_points(output_format):
+            return
         
         # Формируем полный путь к выходному файлу
         output_file = os.path.join(output_dir, output_name)
@@ -722,32 +1229,185 @@ class ConverterApp(QMainWindow):
         self.status_label.setText("Начало обработки...")
         
         # Устанавливаем цвет статуса в зависимости от формата
-        if is_xlsx:
-            self.status_label.setStyleSheet("color: #3498db; font-size: 14px;")
-        else:
-            self.status_label.setStyleSheet("color: #4CAF50; font-size: 14px;")
+        self.status_label.setStyleSheet(
+            f"color: {FORMAT_COLORS[output_format][0]}; font-size: 14px;"
+        )
         
         # Создаем и запускаем поток конвертации
-        self.converter_thread = ConverterThread(input_file, output_file, is_xlsx)
+        self.converter_thread = ConverterThread(
+            input_file, output_file, output_format,
+            xlsx_numbers=self.xlsx_numbers_check.isChecked(),
+            timings_log=os.path.join(output_dir, converter_profile.TIMINGS_LOG)
+            if self.timings_log_check.isChecked() else None,
+            profile_file=output_file + '.prof' if self.profile_check.isChecked() else None,
+            checkpoint=self.checkpoint_check.isChecked() and output_format == 'csv',
+            bucket_ms=self.bucket_spin.value() or None,
+            start_ms=start_ms,
+            end_ms=end_ms,
+            summary=self.summary_check.isChecked(),
+            episodes=self.episodes_check.isChecked(),
+            chart_points=self.chart_points(output_format)
+        )
         self.converter_thread.progress.connect(self.update_progress)
         self.converter_thread.message.connect(self.update_status)
         self.converter_thread.finished.connect(self.conversion_finished)
         self.converter_thread.start()
     
+    def start_batch_conversion(self):
+        """Запуск пакетной конвертации папки"""
+        output_dir = self.output_dir_edit.text()
+        output_format = self.selected_format()
+        start_ms, end_ms = self.time_window()
+        if start_ms is not None and end_ms is not None and start_ms >= end_ms:
+            QMessageBox.critical(self, "Ошибка", "Начало окна Time_ms должно быть меньше конца!")
+            return
+        if not self.check_chart_points(output_format):
+            return
+        
+        # Предупреждение о перезаписи существующих файлов
+        import converter_batch
+        outputs = converter_batch.plan_outputs(self.batch_inputs, output_dir, output_format)
+        existing = [path for path in outputs if os.path.exists(path)]
+        if existing:
+            reply = QMessageBox.question(
+                self, "Подтверждение",
+                f"{len(existing)} из {len(outputs)} файлов уже существуют.\nПерезаписать?",
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if reply != QMessageBox.Yes:
+                return
+        
+        # Блокируем интерфейс
+        self.set_ui_enabled(False)
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setValue(0)
+        self.batch_log.clear()
+        self.batch_log.setVisible(True)
+        self.batch_active = {}
+        self.status_label.setText("Начало обработки...")
+        
+        self.status_label.setStyleSheet(
+            f"color: {FORMAT_COLORS[output_format][0]}; font-size: 14px;"
+        )
+        
+        self.converter_thread = BatchThread(
+            self.batch_inputs, output_dir, output_format,
+            xlsx_numbers=self.xlsx_numbers_check.isChecked(),
+            checkpoint=self.checkpoint_check.isChecked() and output_format == 'csv',
+            bucket_ms=self.bucket_spin.value() or None,
+            start_ms=start_ms,
+            end_ms=end_ms,
+            summary=self.summary_check.isChecked(),
+            episodes=self.episodes_check.isChecked(),
+            chart_points=self.chart_points(output_format),
+            skip_unchanged=self.skip_unchanged_check.isChecked()
+        )
+        self.converter_thread.progress.connect(self.update_batch_progress)
+        self.converter_thread.file_progress.connect(self.update_file_progress)
+        self.converter_thread.file_done.connect(self.batch_file_done)
+        self.converter_thread.message.connect(self.update_status)
+        self.converter_thread.finished.connect(self.batch_finished)
+        self.converter_thread.start()
+    
     def set_ui_enabled(self, enabled):
         """Включает или выключает элементы интерфейса"""
         self.input_file_edit.setEnabled(enabled)
         self.browse_file_btn.setEnabled(enabled)
-        self.xlsx_radio.setEnabled(enabled)
-        self.csv_radio.setEnabled(enabled)
+        self.browse_folder_btn.setEnabled(enabled)
+        for radio in self.format_radios.values():
+            radio.setEnabled(enabled)
+        self.xlsx_numbers_check.setEnabled(enabled and self.xlsx_radio.isChecked())
+        self.checkpoint_check.setEnabled(enabled and self.csv_radio.isChecked())
+        self.bucket_spin.setEnabled(enabled)
+        self.window_start_spin.setEnabled(enabled)
+        self.window_end_spin.setEnabled(enabled)
+        self.summary_check.setEnabled(enabled)
+        self.episodes_check.setEnabled(enabled)
+        self.chart_spin.setEnabled(enabled and self.xlsx_radio.isChecked())
         self.output_dir_edit.setEnabled(enabled)
         self.browse_dir_btn.setEnabled(enabled)
         self.output_name_edit.setEnabled(enabled)
+        self.timings_log_check.setEnabled(enabled)
+        self.profile_check.setEnabled(enabled)
+        self.skip_unchanged_check.setEnabled(enabled and bool(self.batch_inputs))
         self.convert_btn.setEnabled(enabled)
+        # Во время конвертации вместо блокировки доступна отмена
+        self.cancel_btn.setVisible(not enabled)
+        self.cancel_btn.setEnabled(not enabled)
     
-    def update_progress(self, value):
-        """Обновление прогресс бара"""
-        self.progress_bar.setValue(value)
+    def cancel_conversion(self):
+        """Отмена: движок останавливается после текущего блока
+        и удаляет недописанный файл"""
+        if self.converter_thread is None or not self.converter_thread.isRunning():
+            return
+        self.converter_thread.cancel()
+        self.cancel_btn.setEnabled(False)
+        self.status_label.setText("Отмена...")
+    
+    def update_progress(self, info):
+        """Обновление прогресс бара, скорости и оставшегося времени
+
+        Поток присылает уже прореженные уведомления (ProgressReporter),
+        поэтому здесь достаточно перерисовать виджеты.
+        """
+        import converter_engine
+        if self.progress_bar.value() != info.percent:
+            self.progress_bar.setValue(info.percent)
+        self.status_label.setText(converter_engine.format_progress(info))
+        self.progress_bar.setToolTip(
+            f"Прочитано: {info.bytes_read:,} из {info.total_bytes:,} байт\n"
+            f"Строк данных: {info.rows:,}\n"
+            f"Пропущено строк: {info.skipped:,}\n"
+            f"Прошло: {info.elapsed:.1f} с"
+        )
+    
+    def update_batch_progress(self, info):
+        """Общий прогресс пакета; в статусе - проценты файлов в работе"""
+        import converter_engine
+        if self.progress_bar.value() != info.percent:
+            self.progress_bar.setValue(info.percent)
+        self.progress_bar.setToolTip(converter_engine.format_progress(info))
+        
+        active = ", ".join(
+            f"{os.path.basename(self.batch_inputs[index])} {percent}%"
+            for index, percent in sorted(self.batch_active.items())
+        )
+        status = converter_engine.format_progress(info)
+        self.status_label.setText(f"{status}\n{active}" if active else status)
+    
+    def update_file_progress(self, index, info):
+        """Прогресс отдельного файла пакета"""
+        self.batch_active[index] = info.percent
+    
+    def batch_file_done(self, index, result):
+        """Запись о готовом файле в журнал"""
+        self.batch_active.pop(index, None)
+        name = os.path.basename(result.input_file)
+        if result.unchanged:
+            self.batch_log.append(f"⏭ {name}: без изменений")
+        elif result.ok:
+            self.batch_log.append(f"✅ {name}: {result.rows:,} строк, {result.elapsed:.1f} с")
+        else:
+            self.batch_log.append(f"❌ {name}: {result.error}")
+    
+    def batch_finished(self, success, message):
+        """Завершение пакетной конвертации"""
+        self.set_ui_enabled(True)
+        self.progress_bar.setVisible(False)
+        self.check_convert_button()
+        
+        if success:
+            self.status_label.setText("✅ Пакетное преобразование завершено успешно!")
+            self.status_label.setStyleSheet("color: #4CAF50; font-size: 14px;")
+            QMessageBox.information(self, "Успешно", message)
+        elif self.converter_thread.cancel_event.is_set():
+            self.status_label.setText("⏹ Пакетное преобразование отменено")
+            self.status_label.setStyleSheet("color: #aaa; font-size: 14px;")
+            QMessageBox.information(self, "Отменено", message)
+        else:
+            self.status_label.setText("❌ Пакетное преобразование завершено с ошибками")
+            self.status_label.setStyleSheet("color: #f44336; font-size: 14px;")
+            QMessageBox.warning(self, "Ошибка", message)
     
     def update_status(self, message):
         """Обновление статуса"""
@@ -790,6 +1450,11 @@ class ConverterApp(QMainWindow):
                     else:
                         os.system(f'xdg-open "{output_dir}"')
         
+        elif self.converter_thread.cancel_event.is_set():
+            # Недописанный файл движок уже удалил
+            self.status_label.setText("⏹ Преобразование отменено")
+            self.status_label.setStyleSheet("color: #aaa; font-size: 14px;")
+        
         else:
             self.status_label.setText("❌ Ошибка при преобразовании")
             self.status_label.setStyleSheet("color: #f44336; font-size: 14px;")
@@ -798,26 +1463,31 @@ class ConverterApp(QMainWindow):
             QMessageBox.critical(self, "Ошибка", message)
 
 def main():
-    # Проверяем наличие необходимых библиотек
-    try:
-        import pandas
-        import openpyxl
-        from PySide6 import QtWidgets
-    except ImportError as e:
+    # Проверяем наличие необходимых библиотек без их импорта,
+    # чтобы не задерживать появление окна
+    missing = [name for name in ('pandas', 'xlsxwriter')
+               if importlib.util.find_spec(name) is None]
+    if missing:
         print(f"Ошибка: Не удалось импортировать необходимые библиотеки")
         print(f"Установите их с помощью команд:")
-        print(f"pip install pandas openpyxl PySide6")
-        print(f"Ошибка импорта: {e}")
+        print(f"pip install pandas xlsxwriter PySide6")
+        print(f"Не найдены: {', '.join(missing)}")
         return
     
+    # Замер времени запуска: окно закрывается после фоновой загрузки движка
+    startup_report = None
+    if '--startup-benchmark' in sys.argv[1:-1]:
+        startup_report = sys.argv[sys.argv.index('--startup-benchmark') + 1]
+    
     app = QApplication(sys.argv)
     app.setStyle("Fusion")  # Современный стиль
     
     # Запускаем приложение
-    window = ConverterApp()
+    window = ConverterApp(startup_report)
     window.show()
     
     sys.exit(app.exec())
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
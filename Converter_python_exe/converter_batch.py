@@ -0,0 +1,350 @@
+"""Пакетная конвертация файлов MonitorHead на пуле процессов.
+
+Файлы распределяются по процессам (по числу ядер), ошибка в одном файле
+не прерывает остальные. По итогам в выходной папке пишется отчет
+batch_report.json и обновляется манифест conversion_manifest.json,
+по которому повторный запуск пропускает неизменившиеся файлы.
+
+    python -m converter_batch study_folder -o converted -f csv
+    python -m converter_batch "archive/**/*.txt" -o converted --skip-unchanged
+"""
+import sys
+import os
+import glob
+import json
+import time
+import argparse
+import multiprocessing
+import queue
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, CancelledError, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+
+import converter_engine
+import converter_manifest
+
+REPORT_NAME = 'batch_report.json'
+
+
+@dataclass
+class FileResult:
+    """Итог конвертации одного файла пакета"""
+    input_file: str
+    output_file: str
+    ok: bool
+    rows: int = 0
+    skipped: int = 0
+    input_bytes: int = 0
+    output_bytes: int = 0
+    elapsed: float = 0.0
+    error: str = ''
+    output_files: list = field(default_factory=list)
+    sheets: list = field(default_factory=list)
+    # Пропущен: исходный файл и параметры не изменились с прошлой конвертации
+    unchanged: bool = False
+    # Размер, время изменения и хеш исходного файла для манифеста
+    # (converter_manifest.fingerprint)
+    fingerprint: dict = None
+
+
+@dataclass
+class BatchResult:
+    """Итог пакетной конвертации"""
+    files: list
+    elapsed: float
+    report_file: str = ''
+
+    @property
+    def succeeded(self):
+        return sum(1 for r in self.files if r.ok)
+
+    @property
+    def failed(self):
+        return [r for r in self.files if not r.ok]
+
+    @property
+    def unchanged(self):
+        return sum(1 for r in self.files if r.unchanged)
+
+    @property
+    def rows(self):
+        return sum(r.rows for r in self.files)
+
+    @property
+    def input_bytes(self):
+        return sum(r.input_bytes for r in self.files)
+
+    @property
+    def output_bytes(self):
+        return sum(r.output_bytes for r in self.files)
+
+
+def collect_inputs(source):
+    """Входные файлы: все .txt в папке или файлы по glob-шаблону"""
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)
+                 if name.lower().endswith('.txt')]
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(path for path in paths if os.path.isfile(path))
+
+
+def plan_outputs(inputs, output_dir, output_format):
+    """Выходные пути с сохранением структуры подпапок относительно общей папки"""
+    if not inputs:
+        return []
+    base = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in inputs])
+    return [
+        os.path.join(output_dir, converter_engine.default_output_path(
+            os.path.relpath(os.path.abspath(path), base), output_format))
+        for path in inputs
+    ]
+
+
+def _convert_one(index, input_file, output_file, output_format, options, progress_queue,
+                 entry=None):
+    """Конвертация одного файла в процессе пула; исключения не выпускаются наружу.
+
+    Отпечаток исходного файла для манифеста тоже считается здесь, а не
+    в основном процессе: хеш большого файла не задерживает остальные.
+    entry - прежняя запись манифеста, ее хеш годится, если файл не трогали.
+    """
+    started = time.perf_counter()
+    input_bytes = os.path.getsize(input_file) if os.path.exists(input_file) else 0
+
+    def on_progress(info):
+        progress_queue.put((index, info))
+
+    try:
+        # До конвертации: если файл изменится по ходу, запись устареет
+        fingerprint = converter_manifest.fingerprint(input_file, entry)
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        result = converter_engine.convert(
+            input_file, output_file, output_format,
+            on_progress=on_progress if progress_queue is not None else None,
+            **options
+        )
+    except Exception as e:
+        return FileResult(input_file, output_file, False, input_bytes=input_bytes,
+                          elapsed=time.perf_counter() - started, error=str(e))
+
+    return FileResult(input_file, output_file, True, result.rows, result.skipped,
+                      input_bytes, result.file_size, time.perf_counter() - started,
+                      output_files=result.output_files, sheets=result.sheets,
+                      fingerprint=fingerprint)
+
+
+def convert_batch(inputs, output_dir, output_format, workers=None, on_progress=None,
+                  on_file_progress=None, on_file_done=None, skip_unchanged=False,
+                  cancel=None, **options):
+    """Конвертирует список файлов в output_dir на пуле процессов.
+
+    on_file_progress(index, ProgressInfo) — прогресс отдельного файла,
+    on_file_done(index, FileResult) — файл обработан (успешно или нет),
+    on_progress(ProgressInfo) — общий прогресс по байтам всех файлов.
+    skip_unchanged — не конвертировать файлы, которые по манифесту папки
+    не изменились с прошлого запуска (с теми же параметрами).
+    cancel — threading.Event: после установки файлы в очереди не начинаются,
+    а текущие останавливаются после очередного блока (считаются ошибками).
+    options передаются в converter_engine.convert().
+    """
+    started = time.perf_counter()
+    outputs = plan_outputs(inputs, output_dir, output_format)
+    sizes = [os.path.getsize(path) if os.path.exists(path) else 0 for path in inputs]
+    total_bytes = sum(sizes)
+    results = [None] * len(inputs)
+
+    # Прочитанные байты по файлам: готовые файлы считаются целиком
+    bytes_read = [0] * len(inputs)
+    rows = [0] * len(inputs)
+    skipped = [0] * len(inputs)
+    reporter = converter_engine.ProgressReporter(on_progress, total_bytes)
+
+    manifest = converter_manifest.Manifest(output_dir)
+    settings = converter_manifest.conversion_settings(output_format, options)
+
+    def finish(index, result):
+        results[index] = result
+        bytes_read[index] = sizes[index]
+        rows[index] = result.rows
+        skipped[index] = result.skipped
+        if result.ok and not result.unchanged:
+            manifest.record(inputs[index], outputs[index], settings, result,
+                            result.fingerprint)
+        if on_file_done:
+            on_file_done(index, result)
+
+    to_convert = []
+    for index, path in enumerate(inputs):
+        entry = manifest.lookup(path, outputs[index], settings) if skip_unchanged else None
+        if entry is None:
+            to_convert.append(index)
+            continue
+        done = manifest.result(outputs[index], entry)
+        finish(index, FileResult(path, outputs[index], True, done.rows, done.skipped,
+                                 sizes[index], done.file_size, output_files=done.output_files,
+                                 sheets=done.sheets, unchanged=True))
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(to_convert) or 1))
+    want_progress = bool(to_convert) and (on_progress is not None or on_file_progress is not None)
+    want_cancel = bool(to_convert) and cancel is not None
+
+    with multiprocessing.Manager() if want_progress or want_cancel else nullcontext() as manager:
+        progress_queue = manager.Queue() if want_progress else None
+        # Событие отмены, видимое процессам пула
+        worker_cancel = manager.Event() if want_cancel else None
+        if worker_cancel is not None:
+            options = {**options, 'cancel': worker_cancel}
+
+        def drain():
+            while progress_queue is not None:
+                try:
+                    index, info = progress_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if results[index] is not None:
+                    continue
+                bytes_read[index] = info.bytes_read
+                rows[index] = info.rows
+                skipped[index] = info.skipped
+                if on_file_progress:
+                    on_file_progress(index, info)
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(_convert_one, index, inputs[index], outputs[index], output_format,
+                            options, progress_queue, manifest.entry(outputs[index])): index
+                for index in to_convert
+            }
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=converter_engine.PROGRESS_INTERVAL,
+                                     return_when=FIRST_COMPLETED)
+                if want_cancel and cancel.is_set() and not worker_cancel.is_set():
+                    worker_cancel.set()
+                    for future in pending:
+                        future.cancel()
+                drain()
+                for future in done:
+                    index = futures[future]
+                    try:
+                        result = future.result()
+                    except CancelledError:
+                        result = FileResult(inputs[index], outputs[index], False,
+                                            input_bytes=sizes[index],
+                                            error="Конвертация отменена")
+                    except Exception as e:
+                        # Например, аварийное завершение процесса пула
+                        result = FileResult(inputs[index], outputs[index], False,
+                                            input_bytes=sizes[index], error=str(e))
+                    finish(index, result)
+                reporter.update(sum(bytes_read), sum(rows), sum(skipped))
+
+    reporter.update(sum(bytes_read), sum(rows), sum(skipped), force=True)
+
+    batch = BatchResult(results, time.perf_counter() - started)
+    if inputs:
+        manifest.save()
+        batch.report_file = write_report(os.path.join(output_dir, REPORT_NAME), batch, output_format)
+    return batch
+
+
+def write_report(path, batch, output_format):
+    """Сохраняет отчет о пакетной конвертации в JSON"""
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'format': output_format,
+        'elapsed': round(batch.elapsed, 3),
+        'totals': {
+            'files': len(batch.files),
+            'succeeded': batch.succeeded,
+            'unchanged': batch.unchanged,
+            'failed': len(batch.failed),
+            'rows': batch.rows,
+            'input_bytes': batch.input_bytes,
+            'output_bytes': batch.output_bytes,
+        },
+        'files': [asdict(r) for r in batch.files],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def format_summary(batch):
+    """Краткая сводка для вывода пользователю"""
+    counts = f"успешно: {batch.succeeded}, с ошибкой: {len(batch.failed)}"
+    if batch.unchanged:
+        counts += f", без изменений: {batch.unchanged}"
+    text = f"Файлов: {len(batch.files)} ({counts})\n" \
+           f"Строк данных: {batch.rows:,}\n" \
+           f"Прочитано: {batch.input_bytes:,} байт, записано: {batch.output_bytes:,} байт\n" \
+           f"Время: {batch.elapsed:.1f} с"
+    for r in batch.failed:
+        text += f"\n❌ {os.path.basename(r.input_file)}: {r.error}"
+    return text
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='converter_batch',
+        description='Пакетная конвертация файлов MonitorHead в CSV/XLSX'
+    )
+    parser.add_argument('source', help='папка с файлами .txt или glob-шаблон')
+    parser.add_argument('-o', '--output-dir', required=True, help='папка для результатов')
+    parser.add_argument('-f', '--format', choices=list(converter_engine.FORMATS), default='xlsx',
+                        help='формат выходных файлов (по умолчанию xlsx)')
+    parser.add_argument('-j', '--workers', type=int,
+                        help='число процессов (по умолчанию по числу ядер)')
+    parser.add_argument('--skip-unchanged', action='store_true',
+                        help='пропускать файлы, не изменившиеся с прошлой конвертации')
+    converter_engine.add_conversion_arguments(parser)
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    output_format = args.format
+
+    inputs = collect_inputs(args.source)
+    if not inputs:
+        print("Не найдено файлов для конвертации", file=sys.stderr)
+        return 1
+
+    show_progress = not args.quiet and sys.stderr.isatty()
+
+    def on_progress(info):
+        print('\r' + converter_engine.format_progress(info), end='', file=sys.stderr, flush=True)
+
+    def on_file_done(index, result):
+        if show_progress:
+            print('\r', end='', file=sys.stderr)
+        if not args.quiet:
+            status = "✅" if result.ok else "❌"
+            if result.unchanged:
+                detail = "без изменений"
+            elif result.ok:
+                detail = f"{result.rows:,} строк"
+            else:
+                detail = result.error
+            print(f"{status} {result.input_file}: {detail}", file=sys.stderr)
+
+    batch = convert_batch(
+        inputs, args.output_dir, output_format, workers=args.workers,
+        on_progress=on_progress if show_progress else None,
+        on_file_done=on_file_done, skip_unchanged=args.skip_unchanged,
+        **converter_engine.conversion_options(args)
+    )
+
+    if show_progress:
+        print(file=sys.stderr)
+    if not args.quiet:
+        print(format_summary(batch))
+        print(f"Отчет: {batch.report_file}")
+    return 0 if not batch.failed else 1
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""Готовые графики PITCH, ROLL и YAW в XLSX по прореженному ряду.
+
+Excel долго строит график по миллиону точек, поэтому график опирается
+не на лист данных, а на скрытый лист ChartData с рядом не больше
+заданного числа точек на угол. Точки выбираются алгоритмом
+Largest-Triangle-Three-Buckets (LTTB): ряд делится на корзины по числу
+точек, из каждой берется точка, образующая наибольший треугольник
+с выбранной точкой предыдущей корзины и средним следующей, поэтому пики
+и перегибы сохраняются и график выглядит как по исходным данным.
+
+Ряды копятся по ходу разбора. Чтобы память не зависела от размера файла,
+при переполнении буфера соседние группы отсчетов сворачиваются векторно
+до своих минимума и максимума (в порядке времени), размер группы
+удваивается; LTTB считается в конце по этой огибающей. Файлы
+не длиннее буфера (32 точки на точку графика) прореживаются LTTB
+по всем отсчетам.
+"""
+import numpy as np
+
+from converter_engine import ANGLE_COLUMNS, numeric_column
+
+# Лист с графиками и скрытый лист с их рядами
+SHEET_NAME = 'Charts'
+DATA_SHEET_NAME = 'ChartData'
+
+# Точек на угол по умолчанию и предел (столько точек ряда понимает Excel 2007)
+DEFAULT_POINTS = 2000
+MAX_POINTS = 32000
+
+# Буфер ряда: во столько раз больше точек графика
+BUFFER_FACTOR = 32
+
+
+def lttb(x, y, points):
+    """Индексы points точек ряда (x, y), выбранных алгоритмом LTTB.
+
+    Первая и последняя точки остаются всегда; если точек не больше
+    points, возвращаются все.
+    """
+    n = len(x)
+    if n <= points:
+        return np.arange(n)
+
+    # Границы points - 2 корзин по внутренним точкам 1..n-2
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    # Средние корзин через накопленные суммы; "корзина" после последней -
+    # последняя точка
+    sums_x = np.concatenate(([0.0], np.cumsum(x)))
+    sums_y = np.concatenate(([0.0], np.cumsum(y)))
+    sizes = np.diff(edges)
+    mean_x = np.append((sums_x[edges[1:]] - sums_x[edges[:-1]]) / sizes, x[-1])
+    mean_y = np.append((sums_y[edges[1:]] - sums_y[edges[:-1]]) / sizes, y[-1])
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Удвоенная площадь треугольника (a, точка корзины, среднее следующей)
+        area = np.abs((x[a] - mean_x[i + 1]) * (y[lo:hi] - y[a])
+                      - (x[a] - x[lo:hi]) * (mean_y[i + 1] - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def _extremes(x, y, width):
+    """Минимум и максимум каждой группы из width подряд идущих точек
+    (в порядке следования): по две точки на группу"""
+    gx, gy = x.reshape(-1, width), y.reshape(-1, width)
+    low, high = gy.argmin(axis=1), gy.argmax(axis=1)
+    first, second = np.minimum(low, high), np.maximum(low, high)
+    rows = np.arange(len(gx))
+    picked = np.column_stack((first, second))
+    return gx[rows[:, None], picked].ravel(), gy[rows[:, None], picked].ravel()
+
+
+class _Envelope:
+    """Ряд одного угла с ограниченной памятью: до limit точек"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        # Отсчетов на группу; при group == 1 точки хранятся как есть,
+        # иначе по две точки (минимум и максимум) на группу
+        self.group = 1
+        self.x, self.y = [], []
+        self.size = 0
+        # Отсчеты незаконченной группы
+        self.rest_x = self.rest_y = np.empty(0)
+
+    def add(self, x, y):
+        if self.group > 1:
+            x = np.concatenate((self.rest_x, x))
+            y = np.concatenate((self.rest_y, y))
+            full = len(x) // self.group * self.group
+            self.rest_x, self.rest_y = x[full:], y[full:]
+            x, y = _extremes(x[:full], y[:full], self.group)
+        if len(x):
+            self.x.append(x)
+            self.y.append(y)
+            self.size += len(x)
+        while self.size > self.limit:
+            self._compact()
+
+    def _compact(self):
+        """Вдвое сокращает буфер: каждые четыре точки (две группы или четыре
+        отсчета) сворачиваются до минимума и максимума"""
+        x, y = np.concatenate(self.x), np.concatenate(self.y)
+        full = len(x) // 4 * 4
+        head_x, head_y = _extremes(x[:full], y[:full], 4)
+        # Остаток меньше четырех точек остается как есть
+        self.x = [head_x, x[full:]]
+        self.y = [head_y, y[full:]]
+        self.size = len(head_x) + len(x) - full
+        self.group = 4 if self.group == 1 else self.group * 2
+
+    def points(self):
+        x = np.concatenate(self.x + [self.rest_x])
+        y = np.concatenate(self.y + [self.rest_y])
+        if len(x) > 1:
+            # Плоская группа дает одну и ту же точку дважды
+            keep = np.concatenate(([True], (x[1:] != x[:-1]) | (y[1:] != y[:-1])))
+            x, y = x[keep], y[keep]
+        return x, y
+
+
+class ChartSeries:
+    """Потоковый сбор рядов PITCH, ROLL и YAW по чанкам разбора (add),
+    итог — result(): угол -> (Time_ms, значения) не длиннее points"""
+
+    def __init__(self, points=DEFAULT_POINTS):
+        if not 3 <= points <= MAX_POINTS:
+            raise ValueError(f"Точек графика должно быть от 3 до {MAX_POINTS}")
+        self.points = points
+        self.series = {col: _Envelope(points * BUFFER_FACTOR) for col in ANGLE_COLUMNS}
+
+    def add(self, chunk):
+        if not len(chunk):
+            return
+        times = numeric_column(chunk, 'Time_ms').to_numpy()
+        valid = np.isfinite(times)
+        for col, envelope in self.series.items():
+            values = numeric_column(chunk, col).to_numpy()
+            present = valid & np.isfinite(values)
+            envelope.add(times[present], values[present])
+
+    def result(self):
+        result = {}
+        for col, envelope in self.series.items():
+            x, y = envelope.points()
+            selected = lttb(x, y, self.points)
+            result[col] = (x[selected], y[selected])
+        return result
@@ -0,0 +1,100 @@
+"""Контрольные точки для продолжения прерванной конвертации в CSV.
+
+Во время конвертации с контрольными точками временный файл
+session.part.csv не удаляется при сбое или завершении процесса,
+а рядом с выходным файлом раз в CHECKPOINT_INTERVAL секунд сохраняется
+session.csv.checkpoint.json: смещение во входном файле после последнего
+записанного блока, число строк и размер временного файла на этот момент.
+Следующий запуск с контрольными точками продолжает разбор с этого
+смещения и дописывает временный файл, отрезав строки, записанные после
+контрольной точки.
+
+Продолжение возможно, только если входной файл не изменился (размер
+и время изменения) и параметры конвертации те же. Другие форматы
+не поддерживаются: у XLSX, Parquet и Feather оглавление пишется
+в конце файла, поэтому оборванный файл нельзя дописать.
+"""
+import os
+import json
+import time
+
+# Версия формата файла контрольной точки
+CHECKPOINT_VERSION = 1
+
+# Как часто сохраняется контрольная точка, секунд
+CHECKPOINT_INTERVAL = 2.0
+
+
+def checkpoint_path(output_file):
+    """Файл контрольной точки рядом с выходным файлом"""
+    return output_file + '.checkpoint.json'
+
+
+class Checkpoint:
+    """Контрольная точка одной конвертации"""
+
+    def __init__(self, input_file, output_file, part_file, settings):
+        stat = os.stat(input_file)
+        self.path = checkpoint_path(output_file)
+        self.part_file = part_file
+        self.identity = {
+            'input_file': os.path.abspath(input_file),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'settings': settings,
+        }
+        self.saved = None
+
+    def load(self):
+        """Состояние для продолжения (offset, rows, skipped) или None.
+
+        Строки, дописанные во временный файл после контрольной точки,
+        отрезаются.
+        """
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get('version') != CHECKPOINT_VERSION:
+            return None
+        if any(state.get(key) != value for key, value in self.identity.items()):
+            return None
+        try:
+            part_size = os.path.getsize(self.part_file)
+        except OSError:
+            return None
+        if part_size < state['output_size']:
+            return None
+        if part_size > state['output_size']:
+            os.truncate(self.part_file, state['output_size'])
+        return state
+
+    def update(self, output, offset, rows, skipped, force=False):
+        """Сохраняет контрольную точку не чаще раза в CHECKPOINT_INTERVAL секунд.
+
+        output — CsvOutput; записанное сбрасывается на диск до сохранения
+        точки, чтобы точка не опережала файл.
+        """
+        now = time.monotonic()
+        if not force and self.saved is not None and now - self.saved < CHECKPOINT_INTERVAL:
+            return
+        self.saved = now
+        state = {
+            'version': CHECKPOINT_VERSION,
+            **self.identity,
+            'offset': offset,
+            'rows': rows,
+            'skipped': skipped,
+            'output_size': output.flush(),
+        }
+        with open(self.path + '.part', 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(self.path + '.part', self.path)
+
+    def remove(self):
+        """Удаляет контрольную точку (конвертация завершена или отменена)"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,169 @@
+"""Прореживание по интервалам Time_ms: одна строка на интервал.
+
+Отсчеты группируются по интервалам ширины bucket_ms: строка интервала
+содержит его начало (Time_ms), среднее, минимум и максимум каждого угла,
+значение флагов за интервал и число отсчетов (Samples). Флаги
+агрегируются как максимум ('max') или как признак "был установлен хотя
+бы в одном отсчете" ('any', 0 или 1).
+
+Агрегация идет по ходу разбора, по каждому чанку векторно: подряд идущие
+отсчеты одного интервала сворачиваются через ufunc.reduceat. Последний
+интервал чанка может продолжиться в следующем, поэтому он не выдается
+сразу, а хранится как накопленные суммы, минимумы и максимумы
+и объединяется с началом следующего чанка. Память не зависит от размера
+файла, выходной файл меньше исходного в число отсчетов на интервал.
+
+Интервалы выдаются в порядке появления в файле: если Time_ms идет
+не по возрастанию, один интервал может встретиться несколько раз.
+Строки без числового Time_ms в интервалы не попадают и считаются
+отдельно (dropped).
+"""
+import numpy as np
+import pandas as pd
+
+from converter_engine import ANGLE_COLUMNS, FLAG_COLUMNS, FLAG_AGGREGATES, numeric_column
+
+# Знаков после запятой у агрегатов углов
+DECIMALS = 4
+
+# Статистики углов в выходном файле
+ANGLE_STATISTICS = ('mean', 'min', 'max')
+
+
+def bucket_columns():
+    """Столбцы выходного файла в режиме прореживания"""
+    columns = ['Time_ms']
+    for col in ANGLE_COLUMNS:
+        columns += [f'{col}_{name}' for name in ANGLE_STATISTICS]
+    return columns + list(FLAG_COLUMNS) + ['Samples']
+
+
+def format_angles(values):
+    """Текст углов как в выходном файле: запятая, без лишних нулей, NaN -> ''"""
+    # + 0.0 превращает -0.0 в 0.0
+    rounded = np.round(values, DECIMALS) + 0.0
+    text = np.char.mod(f'%.{DECIMALS}f', rounded)
+    text = np.strings.rstrip(np.strings.rstrip(text, '0'), '.')
+    text = np.strings.replace(text, '.', ',')
+    return np.where(np.isnan(values), '', text)
+
+
+def format_integers(values):
+    """Текст целых значений, NaN -> ''"""
+    present = ~np.isnan(values)
+    text = np.where(present, values, 0).astype(np.int64).astype(str)
+    return np.where(present, text, '')
+
+
+class BucketAggregator:
+    """Потоковая агрегация чанков разбора по интервалам Time_ms.
+
+    add(chunk) возвращает законченные интервалы, finish() — последний.
+    """
+
+    def __init__(self, bucket_ms, flags='max'):
+        if bucket_ms <= 0:
+            raise ValueError("Ширина интервала должна быть больше нуля")
+        if flags not in FLAG_AGGREGATES:
+            raise ValueError(f"Неизвестная агрегация флагов: {flags}")
+        self.bucket_ms = bucket_ms
+        self.flags = flags
+        self.columns = bucket_columns()
+        # Накопленное состояние последнего интервала (массивы длины 1)
+        self.pending = None
+        self.dropped = 0
+
+    def runs(self, chunk):
+        """Свертка подряд идущих отсчетов одного интервала: словарь массивов"""
+        time = numeric_column(chunk, 'Time_ms').to_numpy(dtype=np.float64)
+        valid = np.isfinite(time)
+        self.dropped += len(time) - int(np.count_nonzero(valid))
+        bucket = np.floor_divide(time[valid], self.bucket_ms).astype(np.int64)
+        if not len(bucket):
+            return None
+
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(bucket)) + 1))
+        runs = {
+            'bucket': bucket[starts],
+            'samples': np.diff(np.append(starts, len(bucket))),
+        }
+        for col in ANGLE_COLUMNS:
+            values = numeric_column(chunk, col).to_numpy(dtype=np.float64)[valid]
+            present = ~np.isnan(values)
+            runs[col + '_sum'] = np.add.reduceat(np.where(present, values, 0.0), starts)
+            runs[col + '_count'] = np.add.reduceat(present.astype(np.int64), starts)
+            # fmin/fmax пропускают NaN
+            runs[col + '_min'] = np.fmin.reduceat(values, starts)
+            runs[col + '_max'] = np.fmax.reduceat(values, starts)
+        for col in FLAG_COLUMNS:
+            values = numeric_column(chunk, col).to_numpy(dtype=np.float64)[valid]
+            if self.flags == 'any':
+                values = np.where(np.isnan(values), np.nan, values != 0)
+            runs[col] = np.fmax.reduceat(values, starts)
+        return runs
+
+    @staticmethod
+    def _merge(first, second):
+        """Объединяет два накопленных состояния одного интервала"""
+        merged = {}
+        for key, value in first.items():
+            if key == 'bucket':
+                merged[key] = value
+            elif key.endswith('_min'):
+                merged[key] = np.fmin(value, second[key])
+            elif key.endswith(('_sum', '_count')) or key == 'samples':
+                merged[key] = value + second[key]
+            else:
+                merged[key] = np.fmax(value, second[key])
+        return merged
+
+    @staticmethod
+    def _slice(runs, start, stop=None):
+        return {key: value[start:stop] for key, value in runs.items()}
+
+    def add(self, chunk):
+        """Добавляет чанк разбора; возвращает DataFrame законченных интервалов"""
+        runs = self.runs(chunk) if len(chunk) else None
+        if runs is None:
+            return self.frame(None)
+
+        finished = []
+        if self.pending is not None:
+            if self.pending['bucket'][0] == runs['bucket'][0]:
+                head = self._merge(self.pending, self._slice(runs, 0, 1))
+                runs = {key: np.concatenate((head[key], value[1:]))
+                        for key, value in runs.items()}
+            else:
+                finished.append(self.pending)
+        finished.append(self._slice(runs, 0, -1))
+        self.pending = self._slice(runs, -1)
+
+        if len(finished) == 2:
+            finished = {key: np.concatenate((finished[0][key], finished[1][key]))
+                        for key in finished[0]}
+        else:
+            finished = finished[0]
+        return self.frame(finished)
+
+    def finish(self):
+        """DataFrame с последним интервалом (пустой, если отсчетов не было)"""
+        pending, self.pending = self.pending, None
+        return self.frame(pending)
+
+    def frame(self, runs):
+        """Текстовый DataFrame со столбцами self.columns"""
+        if runs is None or not len(runs['bucket']):
+            return pd.DataFrame(columns=self.columns, dtype=str)
+
+        data = {'Time_ms': (runs['bucket'] * self.bucket_ms).astype(str)}
+        for col in ANGLE_COLUMNS:
+            count = runs[col + '_count']
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = np.where(count > 0, runs[col + '_sum'] / count, np.nan)
+            data[col + '_mean'] = format_angles(mean)
+            data[col + '_min'] = format_angles(runs[col + '_min'])
+            data[col + '_max'] = format_angles(runs[col + '_max'])
+        for col in FLAG_COLUMNS:
+            data[col] = format_integers(runs[col])
+        data['Samples'] = runs['samples'].astype(str)
+        return pd.DataFrame(data, columns=self.columns)
@@ -0,0 +1,174 @@
+"""Определение кодировки файлов MonitorHead по выборке.
+
+Файл целиком не читается: берутся начало файла и несколько блоков,
+равномерно расположенных по файлу. Обычные файлы определяются быстрым
+путем — по BOM или по тому, что выборка состоит из ASCII или является
+правильным UTF-8. Только если это не так (cp1251 из старых версий
+MonitorHead), строки выборки с не-ASCII байтами передаются chardet.
+Результат кэшируется по пути, размеру и времени изменения файла.
+
+Строки данных MonitorHead состоят только из ASCII (цифры, ';', ',',
+'.', '-'), кодировка влияет на комментарии. Поэтому разбор поддерживает
+кодировки, совместимые с ASCII; UTF-16 и UTF-32 отклоняются.
+"""
+import os
+import codecs
+from dataclasses import dataclass
+from functools import lru_cache
+
+# Начало файла, которое всегда входит в выборку
+HEAD_SIZE = 64 << 10
+
+# Число и размер блоков выборки, равномерно расположенных по файлу
+SAMPLE_BLOCKS = 4
+SAMPLE_BLOCK_SIZE = 16 << 10
+
+# Сколько байт строк с не-ASCII символами передается chardet
+CHARDET_SAMPLE_SIZE = 32 << 10
+
+# Кодировка, если chardet не установлен или не уверен:
+# старые версии MonitorHead сохраняли файлы в Windows-1251
+FALLBACK_ENCODING = 'cp1251'
+
+# Нижний порог уверенности chardet
+MIN_CONFIDENCE = 0.5
+
+# BOM и кодировки; UTF-32 проверяется раньше UTF-16 (общее начало FF FE)
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+
+# Символы строк данных и комментариев, которые разбираются как байты
+_ASCII_SYNTAX = '#;0123456789.,+-\r\n'
+
+
+@dataclass(frozen=True)
+class DetectedEncoding:
+    """Кодировка файла и способ, которым она определена"""
+    # Имя кодека Python
+    encoding: str
+    # Длина BOM в начале файла (разбор начинается после него)
+    bom: int = 0
+    # 'bom', 'ascii', 'utf-8', 'chardet', 'fallback' или 'explicit'
+    method: str = 'ascii'
+    confidence: float = 1.0
+
+
+def is_ascii_compatible(encoding):
+    """Совпадают ли в кодировке байты цифр, разделителей и концов строк с ASCII"""
+    try:
+        return _ASCII_SYNTAX.encode(encoding) == _ASCII_SYNTAX.encode('ascii')
+    except (LookupError, UnicodeError):
+        return False
+
+
+def normalize_encoding(encoding):
+    """Каноническое имя кодека ('Windows-1251' -> 'cp1251');
+    LookupError для неизвестной кодировки"""
+    return codecs.lookup(encoding).name
+
+
+def read_sample(f, size):
+    """Начало файла и SAMPLE_BLOCKS блоков по файлу, выровненных по строкам"""
+    head = f.read(HEAD_SIZE)
+    if size <= HEAD_SIZE + SAMPLE_BLOCKS * SAMPLE_BLOCK_SIZE:
+        return head + f.read()
+
+    parts = [head]
+    step = (size - HEAD_SIZE) // SAMPLE_BLOCKS
+    for index in range(SAMPLE_BLOCKS):
+        f.seek(HEAD_SIZE + index * step)
+        block = f.read(SAMPLE_BLOCK_SIZE)
+        # Обрезка по концам строк, чтобы не разрывать многобайтные символы
+        start = block.find(b'\n') + 1
+        end = block.rfind(b'\n') + 1
+        if 0 < start < end:
+            parts.append(block[start:end])
+    # Начало файла тоже может оборвать символ UTF-8
+    cut = head.rfind(b'\n')
+    if cut >= 0:
+        parts[0] = head[:cut + 1]
+    return b''.join(parts)
+
+
+def _is_utf8(sample):
+    try:
+        sample.decode('utf-8')
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _chardet(sample):
+    """Кодировка по строкам выборки с не-ASCII байтами (encoding, confidence)"""
+    try:
+        import chardet
+    except ImportError:
+        return None, 0.0
+    lines = [line for line in sample.split(b'\n') if not line.isascii()]
+    text = b'\n'.join(lines)[:CHARDET_SAMPLE_SIZE]
+    result = chardet.detect(text)
+    return result.get('encoding'), result.get('confidence') or 0.0
+
+
+def detect_sample(sample):
+    """Кодировка по выборке байтов (без кэша)"""
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return DetectedEncoding(encoding, len(bom), 'bom')
+
+    if sample.isascii():
+        return DetectedEncoding('utf-8', 0, 'ascii')
+    if _is_utf8(sample):
+        return DetectedEncoding('utf-8', 0, 'utf-8')
+
+    encoding, confidence = _chardet(sample)
+    if encoding and confidence >= MIN_CONFIDENCE:
+        try:
+            encoding = normalize_encoding(encoding)
+        except LookupError:
+            encoding = None
+        if encoding and encoding != 'ascii':
+            return DetectedEncoding(encoding, 0, 'chardet', round(confidence, 2))
+    return DetectedEncoding(FALLBACK_ENCODING, 0, 'fallback', round(confidence, 2))
+
+
+@lru_cache(maxsize=256)
+def _detect_cached(path, size, mtime_ns):
+    with open(path, 'rb') as f:
+        return detect_sample(read_sample(f, size))
+
+
+def detect_encoding(path):
+    """Кодировка файла по выборке; результат кэшируется, пока файл не изменится"""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    return _detect_cached(path, stat.st_size, stat.st_mtime_ns)
+
+
+def resolve_encoding(path, encoding=None):
+    """Кодировка для разбора: заданная явно или определенная по файлу.
+
+    BOM в начале файла пропускается и при явно заданной кодировке.
+    """
+    detected = detect_encoding(path)
+    if encoding is None:
+        return detected
+    encoding = normalize_encoding(encoding)
+    bom = detected.bom if detected.method == 'bom' else 0
+    if encoding == 'utf-8-sig':
+        encoding = 'utf-8'
+    return DetectedEncoding(encoding, bom, 'explicit')
+
+
+def describe_encoding(detected):
+    """Короткое описание для сообщений: 'cp1251 (chardet, 87%)'"""
+    if detected.method in ('chardet', 'fallback'):
+        return f"{detected.encoding} ({detected.method}, {detected.confidence:.0%})"
+    if detected.method == 'bom':
+        return f"{detected.encoding} (BOM)"
+    return detected.encoding
@@ -0,0 +1,1532 @@
+"""Движок конвертации файлов MonitorHead без зависимости от Qt.
+
+Модуль можно импортировать из скриптов или запускать из командной строки:
+
+    python -m converter_engine session.txt -o session.xlsx
+    python -m converter_engine session.txt -f parquet
+"""
+import sys
+import os
+import io
+import re
+import mmap
+import time
+import argparse
+import contextlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+import converter_profile
+import converter_encoding
+import converter_checkpoint
+import converter_pipeline
+
+# Схема выходного файла
+COLUMNS = ['Time_ms', 'PITCH', 'ROLL', 'YAW', 'Dizziness', 'Nystagmus']
+
+# Столбцы углов и флагов. Производные столбцы (PITCH_mean, PITCH_min, ...)
+# имеют тип своего исходного столбца: имя до первого '_'
+ANGLE_COLUMNS = ('PITCH', 'ROLL', 'YAW')
+FLAG_COLUMNS = ('Dizziness', 'Nystagmus')
+
+# Версия схемы выходного файла: увеличивается при любом изменении результата,
+# чтобы манифест (converter_manifest) не пропускал устаревшие файлы
+SCHEMA_VERSION = 1
+
+# Размер блока чтения входного файла (блоки выравниваются по концу строки)
+BLOCK_SIZE = 1 << 20
+
+# Минимальный интервал между уведомлениями о прогрессе, секунды
+PROGRESS_INTERVAL = 0.05
+
+# Размер диапазона байтов, который разбирает один процесс в параллельном режиме
+RANGE_SIZE = 8 << 20
+
+# Параллельный разбор включается для файлов не меньше этого размера:
+# на маленьких файлах запуск процессов дороже выигрыша
+PARALLEL_MIN_SIZE = 64 << 20
+
+# Способы разбора: векторный (pandas) и построчный (эталонный)
+PARSERS = ('vectorized', 'rows')
+
+# Строка, которую C-парсер pandas не может разобрать в точности как построчный
+# путь: не пустая, не комментарий и не "чистая" строка из цифр, знаков
+# и разделителей (пробелы, кавычки, одиночный \r и т.п.). Чистые строки
+# с недостаточным количеством полей нерегулярными не считаются: C-парсер
+# читает их как есть, а _parse_clean отбрасывает их по числу разделителей.
+# Строки после первой ищутся по предшествующему \n: шаблон, начинающийся
+# с литерала, regex-движок ищет заметно быстрее, чем с якорем ^.
+# Первая строка блока проверяется отдельно, чтобы не копировать блок.
+_REGULAR_LINE = rb'(?:#[^\r\n]*|[0-9.,+\-;]*)\r?(?:\n|\Z)'
+_IRREGULAR_LINE = re.compile(rb'\n(?!' + _REGULAR_LINE + rb')[^\n]*')
+_IRREGULAR_FIRST_LINE = re.compile(rb'(?!' + _REGULAR_LINE + rb')[^\n]*')
+
+# Если нерегулярных строк в блоке больше, блок целиком разбирается построчно
+MAX_IRREGULAR_LINES = 32
+
+# Предел строк листа Excel (вместе с заголовком)
+EXCEL_MAX_ROWS = 1048576
+
+# Способы разбиения XLSX при превышении предела строк: листы или книги
+SPLIT_MODES = ('sheets', 'files')
+
+# Агрегация флагов при прореживании по интервалам Time_ms
+# (converter_downsample): максимум или "установлен хотя бы раз"
+FLAG_AGGREGATES = ('max', 'any')
+
+# Форматы выходного файла и их расширения
+FORMATS = {
+    'xlsx': '.xlsx',
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather',
+}
+
+# Сжатие Parquet и Feather (Arrow IPC); оба формата поддерживают эти кодеки
+COMPRESSIONS = ('zstd', 'lz4', 'none')
+
+# Число строк в группе строк Parquet / пакете записей Feather
+ROW_GROUP_ROWS = 1 << 18
+
+
+class ConversionError(Exception):
+    """Ошибка конвертации с сообщением для пользователя"""
+
+
+class ConversionCancelled(ConversionError):
+    """Конвертация отменена пользователем"""
+
+
+@dataclass
+class ConversionResult:
+    """Итог конвертации"""
+    output_file: str
+    rows: int
+    file_size: int
+    skipped: int = 0
+    # Все созданные файлы и листы (больше одного при разбиении XLSX)
+    output_files: list = field(default_factory=list)
+    sheets: list = field(default_factory=list)
+    # Время и память по этапам (converter_profile.StageTimings.report())
+    timings: dict = field(default_factory=dict)
+    # Кодировка, в которой разобран файл
+    encoding: str = 'utf-8'
+    # Сводная статистика (converter_summary.SummaryStats.result()), если запрошена
+    summary: dict = None
+    # Число эпизодов флагов (converter_episodes), если запрошены
+    episodes: int = None
+
+
+def remove_leading_zeros(s):
+    """Удаляет ведущие нули у целого числа (Time_ms)"""
+    if not s.startswith('0'):
+        return s
+    stripped = s.lstrip('0')
+    # Один ноль остается у нуля и перед десятичной точкой
+    if not stripped or stripped.startswith('.'):
+        return '0' + stripped
+    return stripped
+
+
+def remove_leading_zeros_decimal(s):
+    """Удаляет ведущие нули у целой части десятичного числа"""
+    if not s:
+        return s
+
+    is_negative = False
+    if s.startswith('-'):
+        is_negative = True
+        s = s[1:]
+
+    if '.' in s or ',' in s:
+        separator = '.' if '.' in s else ','
+        parts = s.split(separator)
+
+        if len(parts) == 2:
+            integer_part = parts[0]
+            decimal_part = parts[1]
+
+            if integer_part:
+                integer_part = integer_part.lstrip('0') or '0'
+
+            s = integer_part + separator + decimal_part
+
+    if is_negative:
+        s = '-' + s
+
+    return s
+
+
+@dataclass
+class ProgressInfo:
+    """Состояние конвертации для индикатора прогресса"""
+    bytes_read: int
+    total_bytes: int
+    rows: int
+    skipped: int
+    elapsed: float
+
+    @property
+    def percent(self):
+        if not self.total_bytes:
+            return 100
+        return int((self.bytes_read / self.total_bytes) * 100)
+
+    @property
+    def mb_per_s(self):
+        return self.bytes_read / (1 << 20) / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def rows_per_s(self):
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self):
+        """Оценка оставшегося времени в секундах (None, пока нет данных)"""
+        if self.bytes_read <= 0 or self.elapsed <= 0:
+            return None
+        return (self.total_bytes - self.bytes_read) * self.elapsed / self.bytes_read
+
+
+class ProgressReporter:
+    """Прореживает уведомления о прогрессе.
+
+    Callback вызывается, только если изменился процент или с прошлого
+    уведомления прошло не меньше interval секунд, поэтому число вызовов
+    не зависит от размера файла.
+    """
+
+    def __init__(self, callback, total_bytes, interval=PROGRESS_INTERVAL):
+        self.callback = callback
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.last_time = self.started
+        self.last_percent = None
+
+    def update(self, bytes_read, rows, skipped, force=False):
+        if self.callback is None:
+            return
+
+        now = time.perf_counter()
+        info = ProgressInfo(bytes_read, self.total_bytes, rows, skipped, now - self.started)
+        if not force and info.percent == self.last_percent and now - self.last_time < self.interval:
+            return
+
+        self.last_time = now
+        self.last_percent = info.percent
+        self.callback(info)
+
+
+def format_progress(info):
+    """Строка статуса: скорость и оставшееся время"""
+    text = f"{info.percent}% · {info.mb_per_s:.1f} МБ/с · {info.rows_per_s:,.0f} строк/с"
+    if info.eta is not None:
+        minutes, seconds = divmod(int(info.eta + 0.5), 60)
+        text += f" · осталось {minutes}:{seconds:02d}"
+    return text
+
+
+def parse_line(line):
+    """Разбирает строку файла MonitorHead.
+
+    Возвращает список из 6 полей или None для пустых строк,
+    комментариев и строк с недостаточным количеством полей.
+    """
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+
+    parts = line.split(';')
+    if len(parts) < 6:
+        return None
+
+    # Обработка чисел
+    parts[0] = remove_leading_zeros(parts[0])  # Time_ms
+    for i in range(1, 4):  # PITCH, ROLL, YAW
+        parts[i] = remove_leading_zeros_decimal(parts[i].replace('.', ','))
+
+    return parts[:6]
+
+
+def make_chunk(rows):
+    """Создает DataFrame со схемой выходного файла"""
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+
+def _map_file(f, end):
+    """Отображение первых end байт файла в память только для чтения"""
+    mm = mmap.mmap(f.fileno(), end, access=mmap.ACCESS_READ)
+    if hasattr(mmap, 'MADV_SEQUENTIAL'):
+        # Упреждающее чтение и быстрое освобождение прочитанных страниц (не Windows)
+        mm.madvise(mmap.MADV_SEQUENTIAL)
+    return mm
+
+
+def _block_bounds(mm, start, end, block_size):
+    """Границы блоков (начало, конец) участка отображения по концам строк"""
+    pos = start
+    while pos < end:
+        stop = pos + block_size
+        if stop >= end:
+            stop = end
+        else:
+            newline = mm.rfind(b'\n', pos, stop)
+            if newline < 0:
+                newline = mm.find(b'\n', stop, end)
+            stop = newline + 1 if newline >= 0 else end
+        yield pos, stop
+        pos = stop
+
+
+def map_blocks(f, start=0, end=None, block_size=BLOCK_SIZE):
+    """Отображает файл в память и выдает блоки memoryview без копирования.
+
+    Каждый блок, кроме последнего, заканчивается концом строки; строка
+    длиннее block_size попадает в блок целиком. Блок действителен только
+    до перехода к следующему: после этого memoryview освобождается.
+    """
+    if end is None:
+        end = os.fstat(f.fileno()).st_size
+    if end <= start:
+        return
+    with _map_file(f, end) as mm:
+        for pos, stop in _block_bounds(mm, start, end, block_size):
+            with memoryview(mm)[pos:stop] as block:
+                yield block
+
+
+def is_angle_column(col):
+    """Столбец угла (в тексте дробная часть отделяется запятой)"""
+    return col.split('_', 1)[0] in ANGLE_COLUMNS
+
+
+def numeric_column(chunk, col):
+    """Числовые значения столбца чанка, NaN там, где значение не число"""
+    if not len(chunk):
+        return pd.Series(np.empty(0), index=chunk.index)
+    values = chunk[col].to_numpy(dtype=str)
+    if is_angle_column(col):
+        values = np.strings.replace(values, ',', '.')
+    # Быстрый путь: приведение строк numpy в C. Оно понимает '_' и не-ASCII
+    # цифры иначе, чем pandas, поэтому применяется только без них;
+    # при любом нечисловом значении столбец разбирается pd.to_numeric
+    codes = values.view(np.uint32)
+    if codes.max() < 0x80 and not (codes == ord('_')).any():
+        try:
+            return pd.Series(values.astype(np.float64), index=chunk.index)
+        except ValueError:
+            pass
+    return pd.to_numeric(pd.Series(values, index=chunk.index, dtype=object), errors='coerce')
+
+
+def _byte_array(data):
+    """Байты блока (bytes или memoryview) как массив numpy без копирования"""
+    return np.frombuffer(data, dtype=np.uint8)
+
+
+def _count_lines(data):
+    count = int(np.count_nonzero(_byte_array(data) == ord('\n')))
+    return count + (1 if len(data) and data[-1] != ord('\n') else 0)
+
+
+def parse_rows(block, encoding='utf-8'):
+    """Построчный разбор блока байтов (эталонный путь)"""
+    # newline=None дает те же правила деления строк, что и open() в текстовом режиме
+    lines = io.StringIO(str(block, encoding), newline=None).readlines()
+    rows = [parts for parts in map(parse_line, lines) if parts is not None]
+    return make_chunk(rows), len(lines) - len(rows)
+
+
+def _leading_zeros(data, begin):
+    """Длина серии нулей с каждой позиции begin (серия кончается не дальше
+    разделителя, поэтому за пределы data не выходит)"""
+    zeros = np.zeros(len(begin), dtype=np.int64)
+    active = data[begin] == ord('0')
+    while active.any():
+        zeros += active
+        active &= data[begin + zeros] == ord('0')
+    return zeros
+
+
+def _prepare_clean(segment):
+    """Подготовка участка из чистых строк к C-парсеру.
+
+    Числа обрабатываются прямо в байтах, векторно по всему участку, так же
+    как parse_line: у Time_ms удаляются ведущие нули, в углах точка
+    заменяется запятой и удаляются ведущие нули целой части. Возвращает
+    подготовленные байты и маску строк данных (не пустых и не комментариев)
+    с не меньше чем 6 полями в порядке строк DataFrame C-парсера.
+    Неполные строки и комментарии не меняются.
+    """
+    data = _byte_array(segment)
+    size = len(data)
+    ends = np.flatnonzero(data == ord('\n'))
+    starts = np.concatenate(([0], ends + 1))
+    ends = np.append(ends, size)
+    if starts[-1] == size:
+        # После последнего \n строки нет
+        starts, ends = starts[:-1], ends[:-1]
+
+    length = ends - starts
+    # \r перед \n - часть конца строки
+    length -= (length > 0) & (data[np.maximum(ends - 1, 0)] == ord('\r'))
+    comment = (length > 0) & (data[np.minimum(starts, size - 1)] == ord('#'))
+    positions = np.flatnonzero(data == ord(';'))
+    first = np.searchsorted(positions, starts)
+    complete = np.searchsorted(positions, ends) - first >= 5
+    rows = complete[(length > 0) & ~comment]
+    if not rows.any():
+        return segment, rows
+
+    # Поле k полной строки заканчивается k-м разделителем строки
+    first = first[complete]
+    bounds = [positions[first + k] for k in range(4)]
+    field_starts = [starts[complete]] + [bound + 1 for bound in bounds[:3]]
+
+    # Точка в углах (от начала PITCH до конца YAW) заменяется запятой
+    prepared = data.copy()
+    dots = np.flatnonzero(data == ord('.'))
+    line = np.searchsorted(field_starts[1], dots, side='right') - 1
+    in_angles = (line >= 0) & (dots < bounds[3][np.maximum(line, 0)])
+    prepared[dots[in_angles]] = ord(',')
+    commas = np.flatnonzero(prepared == ord(','))
+
+    # Time_ms: нули удаляются, а один остается, если за ними конец поля или точка
+    begin = field_starts[0]
+    zeros = _leading_zeros(prepared, begin)
+    stop = begin + zeros
+    drop_all = (stop != bounds[0]) & (prepared[stop] != ord('.'))
+    removed_starts = [begin]
+    removed = [np.where(zeros > 0, zeros - 1 + drop_all, 0)]
+
+    # Углы: после знака '-', только если запятая в значении ровно одна;
+    # перед запятой один ноль остается
+    for k in range(1, 4):
+        begin = field_starts[k] + (prepared[field_starts[k]] == ord('-'))
+        zeros = _leading_zeros(prepared, begin)
+        single = (np.searchsorted(commas, bounds[k])
+                  - np.searchsorted(commas, field_starts[k])) == 1
+        drop_all = prepared[begin + zeros] != ord(',')
+        removed_starts.append(begin)
+        removed.append(np.where(single & (zeros > 0), zeros - 1 + drop_all, 0))
+
+    removed_starts = np.concatenate(removed_starts)
+    removed = np.concatenate(removed)
+    total = int(removed.sum())
+    if total:
+        # Позиции удаляемых нулей: серии removed байт с removed_starts
+        offsets = np.arange(total) - np.repeat(np.cumsum(removed) - removed, removed)
+        keep = np.ones(size, dtype=bool)
+        keep[np.repeat(removed_starts, removed) + offsets] = False
+        prepared = prepared[keep]
+    return prepared, rows
+
+
+def _parse_clean(segment, encoding='utf-8'):
+    """Разбор участка из чистых строк C-парсером pandas.
+
+    Строки с недостаточным количеством полей C-парсер дополняет пустыми
+    значениями; они отбрасываются одной маской по числу разделителей.
+    """
+    prepared, complete = _prepare_clean(segment)
+    if not complete.any():
+        # Только комментарии, пустые и неполные строки
+        return make_chunk([]), _count_lines(segment)
+    df = pd.read_csv(
+        io.BytesIO(prepared), sep=';', header=None, comment='#',
+        names=COLUMNS, usecols=range(6), dtype=str, keep_default_na=False,
+        engine='c', encoding=encoding
+    )
+    if not complete.all():
+        df = df[complete].reset_index(drop=True)
+    return df, _count_lines(segment) - len(df)
+
+
+def parse_vectorized(block, encoding='utf-8'):
+    """Векторный разбор блока байтов (bytes или memoryview).
+
+    Чистые участки блока читаются pandas, нерегулярные строки между ними
+    разбираются построчно, порядок строк сохраняется. Результат совпадает
+    с parse_rows. encoding должна быть совместима с ASCII
+    (converter_encoding.is_ascii_compatible).
+    """
+    if _byte_array(block).max(initial=0) >= 0x80:
+        # Ошибка кодировки должна проявляться так же, как в построчном пути
+        str(block, encoding)
+
+    # Смещения в блоке: строка вместе с завершающим \n
+    irregular = []
+    first = _IRREGULAR_FIRST_LINE.match(block)
+    if first:
+        irregular.append((0, min(first.end() + 1, len(block))))
+    for match in _IRREGULAR_LINE.finditer(block):
+        irregular.append((match.start() + 1, min(match.end() + 1, len(block))))
+        if len(irregular) > MAX_IRREGULAR_LINES:
+            return parse_rows(block, encoding)
+
+    pieces = []
+    pos = 0
+    for start, end in irregular + [(len(block), len(block))]:
+        if start > pos:
+            pieces.append(_parse_clean(block[pos:start], encoding))
+        if end > start:
+            pieces.append(parse_rows(block[start:end], encoding))
+        pos = end
+
+    chunks = [chunk for chunk, _ in pieces if len(chunk)]
+    skipped = sum(count for _, count in pieces)
+    if not chunks:
+        return make_chunk([]), skipped
+    if len(chunks) == 1:
+        return chunks[0], skipped
+    return pd.concat(chunks, ignore_index=True), skipped
+
+
+def parse_block(block, parser='vectorized', encoding='utf-8'):
+    """Разбирает блок байтов (bytes или memoryview) в кодировке encoding.
+
+    Возвращает DataFrame с обработанными строками и число пропущенных строк
+    (пустые, комментарии, неполные).
+    """
+    if parser == 'rows':
+        return parse_rows(block, encoding)
+    return parse_vectorized(block, encoding)
+
+
+def split_ranges(f, total_bytes, range_size=RANGE_SIZE, start=0):
+    """Делит файл от start до total_bytes на диапазоны байтов (start, end),
+    выровненные по концу строки.
+
+    Как и у блоков map_blocks, каждый диапазон, кроме последнего,
+    заканчивается на \n, поэтому строки, комментарии
+    и \r\n не разрываются между процессами.
+    """
+    ranges = []
+    while start < total_bytes:
+        pos = start + range_size
+        if pos >= total_bytes:
+            ranges.append((start, total_bytes))
+            break
+        f.seek(pos)
+        while True:
+            data = f.read(1 << 16)
+            if not data:
+                end = total_bytes
+                break
+            newline = data.find(b'\n')
+            if newline >= 0:
+                end = pos + newline + 1
+                break
+            pos += len(data)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _parse_range(input_file, start, end, parser, encoding):
+    """Разбор диапазона байтов файла в процессе пула"""
+    with open(input_file, 'rb') as f:
+        for block in map_blocks(f, start, end, block_size=end - start):
+            return parse_block(block, parser, encoding)
+
+
+def _slice_blocks(mm, start, end, block_size=BLOCK_SIZE):
+    """Блоки участка отображения как memoryview без копирования.
+
+    В отличие от map_blocks блок остается действительным после перехода
+    к следующему, поэтому его можно передать в другой поток; освобождает
+    его тот, кто разобрал (_parse_blocks).
+    """
+    for pos, stop in _block_bounds(mm, start, end, block_size):
+        yield memoryview(mm)[pos:stop]
+
+
+def _parse_blocks(blocks, parser, encoding):
+    for block in blocks:
+        with block:
+            chunk, skipped = parse_block(block, parser, encoding)
+            size = len(block)
+        yield chunk, skipped, size
+
+
+def parse_file(input_file, total_bytes, parser='vectorized', workers=1, start=0,
+               encoding='utf-8', on_cpu=None):
+    """Разбирает файл, выдавая (DataFrame, пропущено строк, байт) в порядке файла.
+
+    Разбирается участок от start до total_bytes (start должен стоять
+    в начале строки, после BOM). Чтение и разбор идут в своих потоках
+    конвейера (converter_pipeline) и опережают потребителя на несколько
+    блоков: пока он пишет чанк, следующие читаются и разбираются.
+    Блоки передаются между потоками как memoryview отображения файла,
+    без копирования. on_cpu(секунды) получает время процессора потоков
+    чтения и разбора (converter_pipeline.stage).
+    При workers > 1 диапазоны файла разбираются параллельно в процессах,
+    в работе одновременно не больше 2 * workers диапазонов.
+    """
+    if workers <= 1 or total_bytes - start < PARALLEL_MIN_SIZE:
+        if total_bytes <= start:
+            return
+        with open(input_file, 'rb') as f:
+            mm = _map_file(f, total_bytes)
+        blocks = converter_pipeline.stage(_slice_blocks(mm, start, total_bytes),
+                                          name='reader', on_cpu=on_cpu)
+        try:
+            yield from converter_pipeline.stage(
+                _parse_blocks(blocks, parser, encoding), name='parser', on_cpu=on_cpu)
+        finally:
+            # Отображение закрывается, когда остановлены оба этапа: блоки
+            # в очередях ссылаются на его страницы
+            blocks.close()
+            try:
+                mm.close()
+            except BufferError:
+                # На блок еще ссылается трассировка исключения: отображение
+                # закроется вместе с последним блоком
+                pass
+        return
+
+    with open(input_file, 'rb') as f:
+        ranges = split_ranges(f, total_bytes, start=start)
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending = deque()
+        for start, end in ranges:
+            pending.append((pool.submit(_parse_range, input_file, start, end, parser,
+                                        encoding), end - start))
+            if len(pending) >= 2 * workers:
+                future, size = pending.popleft()
+                yield *future.result(), size
+        while pending:
+            future, size = pending.popleft()
+            yield *future.result(), size
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def numbered_path(path, number):
+    """Путь части: session.xlsx -> session_2.xlsx"""
+    root, ext = os.path.splitext(path)
+    return f"{root}_{number}{ext}"
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class CsvOutput:
+    """Потоковая запись в CSV (разделитель ';', UTF-8 с BOM).
+
+    append=True дописывает строки в конец существующего файла без заголовка,
+    abort() в этом режиме возвращает файл к исходному размеру.
+    """
+
+    def __init__(self, path, append=False, columns=COLUMNS):
+        self.path = path
+        self.paths = [path]
+        self.sheets = []
+        self.append = append
+        if append:
+            self.file = open(path, 'a', encoding='utf-8', newline='')
+            self.initial_size = self.file.tell()
+            return
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        # BOM пишется один раз вручную: кодек utf-8-sig заметно медленнее на
+        # множестве мелких записей
+        self.file.write('\ufeff')
+        pd.DataFrame(columns=columns).to_csv(self.file, sep=';', index=False)
+
+    def write_chunk(self, chunk):
+        chunk.to_csv(self.file, sep=';', index=False, header=False)
+
+    def flush(self):
+        """Сбрасывает записанное на диск; возвращает размер файла"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return os.fstat(self.file.fileno()).st_size
+
+    def close(self):
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+        if self.append:
+            os.truncate(self.path, self.initial_size)
+        else:
+            _remove_file(self.path)
+
+
+class XlsxOutput:
+    """Потоковая запись в XLSX (xlsxwriter в режиме constant_memory).
+
+    Строки сбрасываются на диск по мере разбора, в памяти остается только
+    текущая строка. Ширина столбцов считается по максимальной длине значений
+    и задается при закрытии листа.
+
+    Если строк данных больше max_rows, вывод продолжается на новом листе
+    (Data_1, Data_2, ...) или в новой книге (split='files'); каждая часть
+    начинается с заголовка. Готовые части на диске и в памяти не держатся.
+    """
+
+    # Числовые форматы углов и целых столбцов в режиме numbers: разделитель
+    # дробной части Excel показывает по региональным настройкам пользователя
+    ANGLE_FORMAT = '0.00##'
+    INTEGER_FORMAT = '0'
+
+    SHEET_NAME = 'Data'
+
+    def __init__(self, path, numbers=False, max_rows=EXCEL_MAX_ROWS - 1, split='sheets',
+                 columns=COLUMNS):
+        if not 1 <= max_rows <= EXCEL_MAX_ROWS - 1:
+            raise ValueError(f"max_rows должен быть от 1 до {EXCEL_MAX_ROWS - 1}")
+        if split not in SPLIT_MODES:
+            raise ValueError(f"Неизвестный способ разбиения: {split}")
+
+        self.path = path
+        self.columns = list(columns)
+        self.numbers = numbers
+        self.max_rows = max_rows
+        self.split = split
+        self.paths = []
+        self.sheets = []
+        self._open_workbook(path)
+        self._add_sheet()
+
+    def _open_workbook(self, path):
+        import xlsxwriter
+
+        self.workbook = xlsxwriter.Workbook(path, {
+            'constant_memory': True,
+            # Значения пишутся как текст, без распознавания формул и ссылок
+            'strings_to_formulas': False,
+            'strings_to_urls': False,
+        })
+        self.paths.append(path)
+
+        self.header_format = self.workbook.add_format({
+            'bold': True,
+            'font_size': 12,
+            'bg_color': '#DCE6F1',
+            'align': 'center',
+            'valign': 'vcenter',
+            'border': 1,
+        })
+        angle_format = self.workbook.add_format({'num_format': self.ANGLE_FORMAT})
+        integer_format = self.workbook.add_format({'num_format': self.INTEGER_FORMAT})
+        self.formats = [angle_format if is_angle_column(col) else integer_format
+                        for col in self.columns]
+
+    def _add_sheet(self):
+        name = self.SHEET_NAME
+        if self.split == 'sheets' and self.sheets:
+            if len(self.sheets) == 1:
+                # Первый лист получает номер, только когда появляется второй.
+                # Имя листа xlsxwriter использует лишь при сохранении книги.
+                self.sheets[0] = f"{self.SHEET_NAME}_1"
+                self.worksheet.name = self.sheets[0]
+            name = f"{self.SHEET_NAME}_{len(self.sheets) + 1}"
+
+        self.worksheet = self.workbook.add_worksheet(name)
+        self.worksheet.write_row(0, 0, self.columns, self.header_format)
+        self.sheets.append(name)
+        self.widths = [len(name) for name in self.columns]
+        self.row = 1
+
+    def _finish_sheet(self):
+        for i, width in enumerate(self.widths):
+            self.worksheet.set_column(i, i, width + 2)
+
+    def _rollover(self):
+        self._finish_sheet()
+        if self.split == 'files':
+            self.workbook.close()
+            self._open_workbook(numbered_path(self.path, len(self.paths) + 1))
+        self._add_sheet()
+
+    def write_chunk(self, chunk):
+        start = 0
+        while start < len(chunk):
+            if self.row > self.max_rows:
+                self._rollover()
+            count = min(len(chunk) - start, self.max_rows - self.row + 1)
+            self._write_rows(chunk.iloc[start:start + count])
+            start += count
+
+    def _write_rows(self, chunk):
+        for i, col in enumerate(self.columns):
+            self.widths[i] = max(self.widths[i], int(chunk[col].str.len().max()))
+
+        if self.numbers:
+            self._write_numbers(chunk)
+            return
+
+        write_row = self.worksheet.write_row
+        row = self.row
+        for values in chunk.itertuples(index=False, name=None):
+            write_row(row, 0, values)
+            row += 1
+        self.row = row
+
+    def _write_numbers(self, chunk):
+        """Запись числовых ячеек; значения, которые не являются числом, остаются текстом"""
+        columns = []
+        for col in self.columns:
+            numbers = numeric_column(chunk, col)
+            columns.append(numbers.astype(object).where(numbers.notna(), chunk[col]))
+
+        write = self.worksheet.write
+        formats = self.formats
+        row = self.row
+        for values in zip(*columns):
+            for col, value in enumerate(values):
+                write(row, col, value, formats[col])
+            row += 1
+        self.row = row
+
+    def write_sheet(self, name, tables):
+        """Добавляет в последнюю книгу лист name с небольшими таблицами.
+
+        tables — список (заголовок, строки); таблицы идут одна под другой
+        через пустую строку. Листы данных при этом не меняются.
+        """
+        worksheet = self.workbook.add_worksheet(name)
+        widths = []
+        row = 0
+        for header, rows in tables:
+            worksheet.write_row(row, 0, header, self.header_format)
+            for values in [header] + rows:
+                for col, value in enumerate(values):
+                    width = len(str(value)) if value is not None else 0
+                    if col == len(widths):
+                        widths.append(width)
+                    widths[col] = max(widths[col], width)
+            for values in rows:
+                row += 1
+                worksheet.write_row(row, 0, values)
+            row += 2
+        for col, width in enumerate(widths):
+            worksheet.set_column(col, col, min(width, 40) + 2)
+
+    def write_charts(self, name, data_name, series):
+        """Добавляет в последнюю книгу лист name с графиками и скрытый лист
+        data_name с их рядами.
+
+        series — словарь: имя столбца -> (Time_ms, значения); на каждый
+        непустой ряд — точечная диаграмма с прямыми линиями. Книга
+        открывается на листе графиков.
+        """
+        series = {col: xy for col, xy in series.items() if len(xy[0])}
+        if not series:
+            return
+        charts = self.workbook.add_worksheet(name)
+        data = self.workbook.add_worksheet(data_name)
+        data.hide()
+
+        header = []
+        for col in series:
+            header += ['Time_ms', col]
+        data.write_row(0, 0, header, self.header_format)
+        length = max(len(x) for x, _ in series.values())
+        # Построчно: в режиме constant_memory строки пишутся по порядку
+        for row in range(length):
+            for i, (x, y) in enumerate(series.values()):
+                if row < len(x):
+                    data.write_number(row + 1, 2 * i, float(x[row]))
+                    data.write_number(row + 1, 2 * i + 1, float(y[row]))
+
+        for i, (col, (x, _)) in enumerate(series.items()):
+            chart = self.workbook.add_chart({'type': 'scatter', 'subtype': 'straight'})
+            chart.add_series({
+                'name': col,
+                'categories': [data_name, 1, 2 * i, len(x), 2 * i],
+                'values': [data_name, 1, 2 * i + 1, len(x), 2 * i + 1],
+                'line': {'width': 1},
+            })
+            chart.set_title({'name': col})
+            chart.set_x_axis({'name': 'Time_ms'})
+            chart.set_legend({'none': True})
+            charts.insert_chart(i * 20, 0, chart, {'x_scale': 2.5, 'y_scale': 1.4})
+        charts.activate()
+
+    def close(self):
+        self._finish_sheet()
+        self.workbook.close()
+
+    def abort(self):
+        # Закрытие удаляет временные файлы xlsxwriter
+        try:
+            self.workbook.close()
+        except Exception:
+            pass
+        for path in self.paths:
+            _remove_file(path)
+
+
+class ArrowOutput:
+    """Потоковая запись в Parquet или Feather (Arrow IPC) через pyarrow.
+
+    Столбцы типизированы: Time_ms int64, углы float32, флаги uint8,
+    прочие целые столбцы (число отсчетов) int64;
+    значения, которые не являются числом нужного типа, записываются как
+    пустые (null). Разобранные чанки накапливаются до ROW_GROUP_ROWS строк
+    и сбрасываются группой строк (Parquet) или пакетом записей (Feather).
+    """
+
+    def __init__(self, path, kind, compression='zstd', row_group_rows=ROW_GROUP_ROWS,
+                 columns=COLUMNS):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            import pyarrow.ipc
+        except ImportError:
+            raise ConversionError("Для Parquet и Feather нужна библиотека pyarrow:\n"
+                                  "pip install pyarrow")
+        self.pa = pa
+        self.kind = kind
+        self.path = path
+        self.paths = [path]
+        self.sheets = []
+        self.row_group_rows = row_group_rows
+        self.schema = pa.schema([(col, self.column_type(col)) for col in columns])
+        codec = None if compression == 'none' else compression
+        if kind == 'parquet':
+            self.writer = pq.ParquetWriter(path, self.schema, compression=codec or 'none')
+        else:
+            self.writer = pa.ipc.new_file(
+                path, self.schema, options=pa.ipc.IpcWriteOptions(compression=codec)
+            )
+        self.pending = []
+        self.pending_rows = 0
+
+    def column_type(self, col):
+        """Тип Arrow столбца по его имени"""
+        if is_angle_column(col):
+            return self.pa.float32()
+        if col in FLAG_COLUMNS:
+            return self.pa.uint8()
+        return self.pa.int64()
+
+    def typed_table(self, chunk):
+        """Таблица Arrow со схемой self.schema из текстового чанка"""
+        arrays = []
+        for column in self.schema:
+            values = numeric_column(chunk, column.name)
+            if self.pa.types.is_integer(column.type):
+                info = np.iinfo(column.type.to_pandas_dtype())
+                values = values.where((values == np.floor(values))
+                                      & (values >= info.min) & (values <= info.max))
+            arrays.append(self.pa.array(values, type=column.type, from_pandas=True))
+        return self.pa.Table.from_arrays(arrays, schema=self.schema)
+
+    def write_table(self, table):
+        if self.kind == 'parquet':
+            self.writer.write_table(table, row_group_size=self.row_group_rows)
+        else:
+            self.writer.write_table(table, max_chunksize=self.row_group_rows)
+
+    def write_chunk(self, chunk):
+        self.pending.append(self.typed_table(chunk))
+        self.pending_rows += len(chunk)
+        if self.pending_rows < self.row_group_rows:
+            return
+        # Пишутся только полные группы, остаток ждет следующих чанков
+        table = self.pa.concat_tables(self.pending)
+        full = len(table) - len(table) % self.row_group_rows
+        self.write_table(table.slice(0, full))
+        rest = table.slice(full)
+        self.pending = [rest] if len(rest) else []
+        self.pending_rows = len(rest)
+
+    def close(self):
+        if self.pending:
+            self.write_table(self.pa.concat_tables(self.pending))
+        self.writer.close()
+
+    def abort(self):
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+        _remove_file(self.path)
+
+
+def open_output(path, output_format, xlsx_numbers=False, max_rows=EXCEL_MAX_ROWS - 1,
+                split='sheets', compression='zstd', columns=COLUMNS):
+    """Создает writer для выбранного формата (ключ FORMATS) со столбцами columns"""
+    if output_format == 'xlsx':
+        return XlsxOutput(path, numbers=xlsx_numbers, max_rows=max_rows, split=split,
+                          columns=columns)
+    if output_format in ('parquet', 'feather'):
+        return ArrowOutput(path, output_format, compression, columns=columns)
+    return CsvOutput(path, columns=columns)
+
+
+def part_path(output_file):
+    """Временный файл для записи (расширение сохраняется для writer'ов)"""
+    root, ext = os.path.splitext(output_file)
+    return root + '.part' + ext
+
+
+def input_encoding(input_file, encoding=None):
+    """Кодировка исходного файла (converter_encoding.DetectedEncoding):
+    заданная явно или определенная по выборке.
+
+    Выбрасывает ConversionError для неизвестной кодировки и для кодировок,
+    несовместимых с ASCII (UTF-16, UTF-32).
+    """
+    try:
+        detected = converter_encoding.resolve_encoding(input_file, encoding)
+    except LookupError:
+        raise ConversionError(f"Неизвестная кодировка: {encoding}")
+    if not converter_encoding.is_ascii_compatible(detected.encoding):
+        raise ConversionError(
+            f"Кодировка {detected.encoding} не поддерживается.\n"
+            f"Сохраните файл в UTF-8 или Windows-1251."
+        )
+    return detected
+
+
+def encoding_error(error, encoding):
+    """ConversionError для UnicodeDecodeError при разборе"""
+    return ConversionError(
+        f"Файл не соответствует кодировке {encoding}: {error.reason} "
+        f"(байт {error.object[error.start:error.end]!r}).\nУкажите кодировку явно."
+    )
+
+
+def window_rows(chunk, start_ms=None, end_ms=None):
+    """Строки чанка с start_ms <= Time_ms < end_ms (без числового Time_ms - нет)"""
+    times = numeric_column(chunk, 'Time_ms').to_numpy()
+    inside = np.isfinite(times)
+    if start_ms is not None:
+        inside &= times >= start_ms
+    if end_ms is not None:
+        inside &= times < end_ms
+    return chunk if inside.all() else chunk[inside]
+
+
+def time_window(input_file, detected, start_ms, end_ms, parser, timings, reporter,
+                check_cancel, message):
+    """Участок файла (начало, конец) со строками окна Time_ms по индексу
+    converter_timeindex; индекс строится и сохраняется, если его еще нет"""
+    import converter_timeindex
+
+    index = converter_timeindex.TimeIndex(input_file, detected.encoding, detected.bom)
+    if not index.load():
+        message("Построение индекса Time_ms...")
+        try:
+            with timings.stage('index'):
+                for position in index.build(parser):
+                    reporter.update(position, 0, 0)
+                    check_cancel()
+        except UnicodeDecodeError as e:
+            raise encoding_error(e, detected.encoding) from e
+        index.save()
+
+    window = index.byte_range(start_ms, end_ms)
+    if window is None:
+        raise ConversionError("Нет строк в окне Time_ms")
+    first, end = window
+    message(f"Окно Time_ms: {end - first:,} байт из {index.identity['size']:,}")
+    return first, end
+
+
+def output_paths(output_file, count):
+    """Итоговые имена частей: одна часть сохраняется под исходным именем"""
+    if count == 1:
+        return [output_file]
+    return [numbered_path(output_file, number) for number in range(1, count + 1)]
+
+
+def convert(input_file, output_file, output_format, on_progress=None, on_message=None,
+            parser='vectorized', xlsx_numbers=False, max_rows=EXCEL_MAX_ROWS - 1,
+            split='sheets', compression='zstd', workers=1, timings=None, encoding=None,
+            cancel=None, checkpoint=False, bucket_ms=None, flag_agg='max', start_ms=None,
+            end_ms=None, summary=False, episodes=False, chart_points=None):
+    """Конвертирует файл MonitorHead за один проход.
+
+    output_format — ключ FORMATS: xlsx, csv, parquet или feather.
+    on_progress(ProgressInfo) и on_message(text) вызываются по ходу работы,
+    прогресс считается по прочитанным байтам и передается не чаще,
+    чем раз в PROGRESS_INTERVAL секунд (или при смене процента).
+    parser — способ разбора из PARSERS, результат у них одинаковый.
+    xlsx_numbers — писать в XLSX числа с числовым форматом вместо текста.
+    max_rows и split — предел строк данных на лист XLSX и способ разбиения
+    (новые листы или новые книги session_1.xlsx, session_2.xlsx, ...).
+    compression — сжатие Parquet и Feather из COMPRESSIONS.
+    workers — число процессов разбора для файлов от PARALLEL_MIN_SIZE байт,
+    результат не зависит от числа процессов.
+    timings — converter_profile.StageTimings для замеров по этапам
+    (по умолчанию создается свой), итог попадает в result.timings.
+    encoding — кодировка исходного файла, по умолчанию определяется
+    по выборке (converter_encoding); BOM пропускается.
+    cancel — объект с методом is_set() (threading.Event): проверяется после
+    каждого блока, при отмене выбрасывается ConversionCancelled.
+    checkpoint — для CSV сохранять контрольные точки и продолжать
+    прерванную конвертацию с последней из них (converter_checkpoint).
+    bucket_ms — вместо каждого отсчета писать строку на интервал Time_ms
+    этой ширины (converter_downsample): углы — среднее, минимум и максимум,
+    флаги — flag_agg ('max' или 'any').
+    start_ms и end_ms — конвертировать только строки окна
+    start_ms <= Time_ms < end_ms (любую границу можно не задавать).
+    Читается лишь участок файла с окном по индексу Time_ms
+    (converter_timeindex), который строится при первом обращении
+    и хранится рядом с исходным файлом.
+    summary — в том же проходе собрать сводную статистику (converter_summary):
+    она сохраняется в session.summary.json, в XLSX — еще и на лист Summary,
+    и попадает в result.summary.
+    episodes — найти эпизоды флагов Dizziness и Nystagmus (converter_episodes):
+    в XLSX — лист Episodes, в других форматах — session.episodes.csv.
+    chart_points — в XLSX добавить графики PITCH, ROLL и YAW (лист Charts)
+    по ряду из не больше chart_points точек на угол, выбранных LTTB
+    (converter_chart); ряды лежат на скрытом листе ChartData.
+    При прореживании, сводке и эпизодах контрольные точки не сохраняются:
+    их незаконченное состояние живет только в памяти.
+    Запись идет во временный файл рядом с выходным, который переименовывается
+    только после успешного завершения. При ошибке выбрасывает ConversionError,
+    временный файл удаляется.
+    """
+    def message(text):
+        if on_message:
+            on_message(text)
+
+    total_bytes = os.path.getsize(input_file)
+    if total_bytes == 0:
+        raise ConversionError("Файл пуст")
+
+    message(f"Размер файла: {total_bytes:,} байт")
+
+    detected = input_encoding(input_file, encoding)
+    if detected.method not in ('ascii', 'utf-8'):
+        message(f"Кодировка: {converter_encoding.describe_encoding(detected)}")
+
+    window = start_ms is not None or end_ms is not None
+    if start_ms is not None and end_ms is not None and start_ms >= end_ms:
+        raise ConversionError("Начало окна Time_ms должно быть меньше конца")
+
+    aggregator = None
+    columns = COLUMNS
+    if bucket_ms:
+        import converter_downsample
+        try:
+            aggregator = converter_downsample.BucketAggregator(bucket_ms, flag_agg)
+        except ValueError as e:
+            raise ConversionError(str(e))
+        columns = aggregator.columns
+        message(f"Прореживание: интервалы по {bucket_ms:,} мс")
+
+    stats = None
+    if summary:
+        import converter_summary
+        stats = converter_summary.SummaryStats()
+
+    tracker = None
+    if episodes:
+        import converter_episodes
+        tracker = converter_episodes.EpisodeTracker()
+
+    chart = None
+    if chart_points:
+        if output_format != 'xlsx':
+            message("Графики строятся только в XLSX")
+        else:
+            import converter_chart
+            try:
+                chart = converter_chart.ChartSeries(chart_points)
+            except ValueError as e:
+                raise ConversionError(str(e))
+
+    in_memory = aggregator is not None or stats is not None or tracker is not None
+    if checkpoint and output_format == 'csv' and in_memory:
+        message("Контрольные точки не сохраняются: прореживание, сводка и эпизоды "
+                "считаются в памяти")
+
+    if timings is None:
+        timings = converter_profile.StageTimings()
+    timings.start()
+
+    def check_cancel():
+        if cancel is not None and cancel.is_set():
+            raise ConversionCancelled("Конвертация отменена")
+
+    first_offset, end_offset = detected.bom, total_bytes
+    if window:
+        try:
+            first_offset, end_offset = time_window(
+                input_file, detected, start_ms, end_ms, parser, timings,
+                ProgressReporter(on_progress, total_bytes), check_cancel, message
+            )
+        except BaseException:
+            timings.stop()
+            raise
+
+    def parse_cpu(seconds):
+        # Время процессора потоков конвейера относится к этапу разбора
+        timings.add_cpu('parse', seconds)
+
+    def parse_with_fallback(offset):
+        """parse_file; если определенная по выборке кодировка не подходит
+        для байтов дальше в файле (комментарий в cp1251 в UTF-8 файле),
+        разбор продолжается с этого блока в FALLBACK_ENCODING.
+        Явно заданная кодировка не подменяется."""
+        nonlocal detected
+        while True:
+            try:
+                for item in parse_file(input_file, end_offset, parser, workers, offset,
+                                       detected.encoding, parse_cpu):
+                    offset += item[2]
+                    yield item
+                return
+            except UnicodeDecodeError as e:
+                fallback = converter_encoding.FALLBACK_ENCODING
+                if detected.method == 'explicit' or detected.encoding == fallback:
+                    raise
+                message(f"Байт {e.object[e.start:e.end]!r} не читается в кодировке "
+                        f"{detected.encoding}, разбор продолжается в {fallback}")
+                detected = converter_encoding.DetectedEncoding(fallback, detected.bom,
+                                                               'fallback', 0.0)
+
+    part_file = part_path(output_file)
+    resume = None
+    if checkpoint and output_format == 'csv' and not in_memory:
+        checkpoint = converter_checkpoint.Checkpoint(input_file, output_file, part_file, {
+            'format': output_format,
+            'schema': SCHEMA_VERSION,
+            'encoding': detected.encoding,
+            'start_ms': start_ms,
+            'end_ms': end_ms,
+        })
+        resume = checkpoint.load()
+    else:
+        checkpoint = None
+
+    if resume:
+        output = CsvOutput(part_file, append=True)
+        rows_written, skipped, bytes_read = resume['rows'], resume['skipped'], resume['offset']
+        message(f"Продолжение с контрольной точки: "
+                f"{(bytes_read - first_offset) / (end_offset - first_offset):.0%}, "
+                f"{rows_written:,} строк")
+    else:
+        output = open_output(part_file, output_format, xlsx_numbers, max_rows, split,
+                             compression, columns)
+        rows_written, skipped, bytes_read = 0, 0, first_offset
+    # Прогресс считается по читаемому участку (без окна - по всему файлу)
+    progress_base = first_offset if window else 0
+    reporter = ProgressReporter(on_progress, end_offset - progress_base)
+    try:
+        # Чтение через mmap происходит по ходу разбора, поэтому это один этап
+        for chunk, block_skipped, block_bytes in timings.timed(
+                'parse', parse_with_fallback(bytes_read)):
+            if window:
+                chunk = window_rows(chunk, start_ms, end_ms)
+            if stats is not None:
+                with timings.stage('summary'):
+                    stats.add(chunk)
+            if tracker is not None:
+                with timings.stage('episodes'):
+                    tracker.add(chunk)
+            if chart is not None:
+                with timings.stage('chart'):
+                    chart.add(chunk)
+            if aggregator is not None:
+                with timings.stage('aggregate'):
+                    chunk = aggregator.add(chunk)
+            if len(chunk):
+                with timings.stage('write'):
+                    output.write_chunk(chunk)
+                rows_written += len(chunk)
+
+            skipped += block_skipped
+            bytes_read += block_bytes
+            reporter.update(bytes_read - progress_base, rows_written, skipped)
+            check_cancel()
+            if checkpoint:
+                checkpoint.update(output, bytes_read, rows_written, skipped)
+
+        if aggregator is not None:
+            chunk = aggregator.finish()
+            if len(chunk):
+                with timings.stage('write'):
+                    output.write_chunk(chunk)
+                rows_written += len(chunk)
+            if aggregator.dropped:
+                message(f"Строк без числового Time_ms (не вошли в интервалы): "
+                        f"{aggregator.dropped:,}")
+
+        reporter.update(bytes_read - progress_base, rows_written, skipped, force=True)
+
+        if rows_written == 0:
+            raise ConversionError("Нет строк в окне Time_ms" if window
+                                  else "Нет данных для обработки")
+
+        check_cancel()
+        message(f"Сохранение в {output_format.upper()}...")
+        with timings.stage('finalize'):
+            if stats is not None:
+                totals = stats.result()
+                if isinstance(output, XlsxOutput):
+                    output.write_sheet(converter_summary.SHEET_NAME,
+                                       converter_summary.summary_tables(totals))
+            if tracker is not None:
+                found = tracker.finish()
+                if isinstance(output, XlsxOutput):
+                    output.write_sheet(converter_episodes.SHEET_NAME,
+                                       [(converter_episodes.COLUMNS, found)])
+            if chart is not None:
+                output.write_charts(converter_chart.SHEET_NAME,
+                                    converter_chart.DATA_SHEET_NAME, chart.result())
+            output.close()
+            output_files = output_paths(output_file, len(output.paths))
+            for path, final_path in zip(output.paths, output_files):
+                os.replace(path, final_path)
+            if stats is not None:
+                converter_summary.save_summary(
+                    converter_summary.summary_path(output_file), totals,
+                    input_file=os.path.abspath(input_file), start_ms=start_ms, end_ms=end_ms
+                )
+            if tracker is not None and not isinstance(output, XlsxOutput):
+                converter_episodes.save_episodes(
+                    converter_episodes.episodes_path(output_file), found
+                )
+    except BaseException as e:
+        if checkpoint and not isinstance(e, (ConversionError, UnicodeDecodeError)):
+            # Сбой или прерывание: временный файл и контрольная точка
+            # остаются, следующий запуск продолжит с нее
+            output.close()
+            raise
+        output.abort()
+        if checkpoint:
+            checkpoint.remove()
+            _remove_file(part_file)
+        if isinstance(e, UnicodeDecodeError):
+            raise encoding_error(e, detected.encoding) from e
+        raise
+    finally:
+        timings.stop()
+
+    if checkpoint:
+        checkpoint.remove()
+
+    return ConversionResult(
+        output_file, rows_written, sum(os.path.getsize(path) for path in output_files),
+        skipped, output_files, output.sheets, timings.report(), detected.encoding,
+        totals if stats is not None else None,
+        len(found) if tracker is not None else None
+    )
+
+
+def default_output_path(input_file, output_format):
+    """Имя выходного файла по имени входного"""
+    base, ext = os.path.splitext(input_file)
+    if ext.lower() != '.txt':
+        base = input_file
+    return base + FORMATS[output_format]
+
+
+def format_from_path(path, default='xlsx'):
+    """Формат выходного файла по расширению"""
+    ext = os.path.splitext(path)[1].lower()
+    for output_format, format_ext in FORMATS.items():
+        if ext == format_ext:
+            return output_format
+    return default
+
+
+def add_conversion_arguments(parser):
+    """Общие параметры конвертации для командной строки (движок и пакетный режим)"""
+    parser.add_argument('--parser', choices=PARSERS, default='vectorized',
+                        help='способ разбора (rows — построчный эталон)')
+    parser.add_argument('--xlsx-numbers', action='store_true',
+                        help='писать в XLSX числа (Time_ms, углы, флаги) вместо текста')
+    parser.add_argument('--max-rows', type=int, default=EXCEL_MAX_ROWS - 1,
+                        help='предел строк данных на лист XLSX (по умолчанию предел Excel)')
+    parser.add_argument('--split', choices=SPLIT_MODES, default='sheets',
+                        help='при превышении предела: новые листы или новые книги')
+    parser.add_argument('--compression', choices=COMPRESSIONS, default='zstd',
+                        help='сжатие Parquet и Feather (по умолчанию zstd)')
+    parser.add_argument('--encoding',
+                        help='кодировка исходного файла (по умолчанию определяется '
+                             'автоматически), например cp1251')
+    parser.add_argument('--checkpoint', action='store_true',
+                        help='CSV: сохранять контрольные точки и продолжать прерванную '
+                             'конвертацию с последней из них')
+    parser.add_argument('--bucket-ms', type=int, metavar='MS',
+                        help='писать строку на интервал Time_ms этой ширины: углы — '
+                             'среднее, минимум и максимум, флаги — см. --flag-agg')
+    parser.add_argument('--flag-agg', choices=FLAG_AGGREGATES, default='max',
+                        help='флаги за интервал: максимум или 1, если флаг был '
+                             'установлен хотя бы раз (по умолчанию max)')
+    parser.add_argument('--start-ms', type=int, metavar='MS',
+                        help='конвертировать строки с Time_ms не меньше MS')
+    parser.add_argument('--end-ms', type=int, metavar='MS',
+                        help='конвертировать строки с Time_ms меньше MS (окно читается '
+                             'по индексу рядом с исходным файлом, без чтения всего файла)')
+    parser.add_argument('--summary', action='store_true',
+                        help='сводная статистика в том же проходе: session.summary.json '
+                             'и лист Summary в XLSX')
+    parser.add_argument('--episodes', action='store_true',
+                        help='эпизоды флагов Dizziness и Nystagmus: лист Episodes в XLSX, '
+                             'иначе session.episodes.csv')
+    parser.add_argument('--chart-points', type=int, metavar='N',
+                        help='XLSX: графики PITCH, ROLL и YAW на листе Charts по N точкам '
+                             'на угол (прореживание LTTB)')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='не выводить сообщения о ходе работы')
+
+
+def conversion_options(args):
+    """Именованные параметры convert() из разобранной командной строки"""
+    return {
+        'parser': args.parser,
+        'xlsx_numbers': args.xlsx_numbers,
+        'max_rows': args.max_rows,
+        'split': args.split,
+        'compression': args.compression,
+        'encoding': args.encoding,
+        'checkpoint': args.checkpoint,
+        'bucket_ms': args.bucket_ms,
+        'flag_agg': args.flag_agg,
+        'start_ms': args.start_ms,
+        'end_ms': args.end_ms,
+        'summary': args.summary,
+        'episodes': args.episodes,
+        'chart_points': args.chart_points,
+    }
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='converter_engine',
+        description='Конвертер текстовых файлов MonitorHead в CSV/XLSX'
+    )
+    parser.add_argument('input', help='исходный файл .txt')
+    parser.add_argument('-o', '--output',
+                        help='выходной файл (по умолчанию рядом с исходным)')
+    parser.add_argument('-f', '--format', choices=list(FORMATS),
+                        help='формат выходного файла (по умолчанию по расширению, иначе xlsx)')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='число процессов разбора большого файла (0 — по числу ядер)')
+    parser.add_argument('--skip-unchanged', action='store_true',
+                        help='не конвертировать заново, если исходный файл и параметры '
+                             'не изменились (манифест в папке результата)')
+    parser.add_argument('--timings', metavar='LOG',
+                        help='вывести время по этапам и дописать замер в журнал JSON Lines')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='пик памяти каждого этапа через tracemalloc (медленнее)')
+    parser.add_argument('--profile', metavar='FILE.prof',
+                        help='профилировать конвертацию cProfile и сохранить статистику')
+    add_conversion_arguments(parser)
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+
+    if args.format:
+        output_format = args.format
+    elif args.output:
+        output_format = format_from_path(args.output)
+    else:
+        output_format = 'xlsx'
+
+    output_file = args.output or default_output_path(args.input, output_format)
+
+    if not os.path.exists(args.input):
+        print("Входной файл не существует!", file=sys.stderr)
+        return 1
+
+    show_progress = not args.quiet and sys.stderr.isatty()
+    progress_line = []
+
+    def on_message(text):
+        if progress_line:
+            print(file=sys.stderr)
+            progress_line.clear()
+        if not args.quiet:
+            print(text, file=sys.stderr)
+
+    def on_progress(info):
+        print('\r' + format_progress(info), end='', file=sys.stderr, flush=True)
+        progress_line.append(True)
+
+    options = conversion_options(args)
+    manifest = None
+    if args.skip_unchanged:
+        import converter_manifest
+        manifest = converter_manifest.Manifest(os.path.dirname(os.path.abspath(output_file)))
+        settings = converter_manifest.conversion_settings(output_format, options)
+        entry = manifest.lookup(args.input, output_file, settings)
+        if entry is not None:
+            # lookup обновляет время изменения тронутого файла: без сохранения
+            # хеш считался бы при каждом запуске
+            manifest.save()
+            if not args.quiet:
+                print(f"Без изменений: {output_file}")
+            return 0
+
+    timings = converter_profile.StageTimings(trace_memory=args.trace_memory)
+    try:
+        profiling = (converter_profile.profile_run(args.profile) if args.profile
+                     else contextlib.nullcontext())
+        with profiling:
+            result = convert(args.input, output_file, output_format,
+                             on_progress=on_progress if show_progress else None,
+                             on_message=on_message, workers=args.workers or os.cpu_count() or 1,
+                             timings=timings, **options)
+        if args.timings:
+            converter_profile.append_log(args.timings, result.timings,
+                                         input_file=os.path.abspath(args.input),
+                                         output_format=output_format, rows=result.rows)
+        if manifest is not None:
+            manifest.record(args.input, output_file, settings, result)
+            manifest.save()
+    except ConversionError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        if progress_line:
+            print(file=sys.stderr)
+        if args.checkpoint and output_format == 'csv' and not args.bucket_ms:
+            print("Прервано. Повторный запуск с --checkpoint продолжит с контрольной точки.",
+                  file=sys.stderr)
+        else:
+            print("Прервано.", file=sys.stderr)
+        return 130
+    except Exception as e:
+        print(f"Ошибка при конвертации:\n{str(e)}", file=sys.stderr)
+        return 1
+
+    if not args.quiet:
+        for path in result.output_files:
+            print(f"Сохранен как: {path}")
+        if len(result.sheets) > 1:
+            print(f"Листы: {', '.join(result.sheets)}")
+        print(f"Размер: {result.file_size:,} байт")
+        print(f"Строк данных: {result.rows}")
+        print(f"Пропущено строк: {result.skipped}")
+        if result.summary is not None:
+            import converter_summary
+            print(f"Сводка: {converter_summary.summary_path(output_file)}")
+        if result.episodes is not None:
+            import converter_episodes
+            if output_format == 'xlsx':
+                print(f"Эпизодов флагов: {result.episodes} (лист Episodes)")
+            else:
+                print(f"Эпизодов флагов: {result.episodes} "
+                      f"({converter_episodes.episodes_path(output_file)})")
+        if args.timings or args.trace_memory or args.profile:
+            for line in converter_profile.format_timings(result.timings):
+                print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
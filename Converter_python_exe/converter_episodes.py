@@ -0,0 +1,105 @@
+"""Эпизоды флагов Dizziness и Nystagmus: кодирование длинами серий.
+
+Эпизод — серия подряд идущих отсчетов, в которых флаг установлен.
+Для каждого эпизода записываются флаг, Time_ms начала (первый отсчет
+с флагом), Time_ms конца (первый отсчет после эпизода, когда флаг
+снят; для эпизода в конце файла — последний отсчет), длительность
+и число отсчетов. Длительности эпизодов в сумме дают время с флагом
+из сводки (converter_summary).
+
+Границы серий находятся по каждому чанку векторно (np.diff по флагу),
+незаконченный эпизод в конце чанка переносится в следующий. Строки
+без числового Time_ms пропускаются, нечисловое значение флага считается
+снятым флагом.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from converter_engine import FLAG_COLUMNS, numeric_column
+
+# Имя листа эпизодов в XLSX
+SHEET_NAME = 'Episodes'
+
+# Столбцы таблицы эпизодов
+COLUMNS = ['Flag', 'Start_ms', 'End_ms', 'Duration_ms', 'Samples']
+
+
+def episodes_path(output_file):
+    """CSV эпизодов рядом с результатом: session.csv -> session.episodes.csv"""
+    return os.path.splitext(output_file)[0] + '.episodes.csv'
+
+
+def _number(value):
+    """Целое значение времени без '.0'"""
+    return int(value) if float(value).is_integer() else float(value)
+
+
+class EpisodeTracker:
+    """Потоковый поиск эпизодов по чанкам разбора.
+
+    add(chunk) копит законченные эпизоды, finish() закрывает незаконченные;
+    episodes — строки таблицы по столбцам COLUMNS.
+    """
+
+    def __init__(self):
+        self.episodes = []
+        # Незаконченный эпизод флага: [Time_ms начала, отсчетов] или None
+        self.open = {col: None for col in FLAG_COLUMNS}
+        self.last_time = None
+
+    def add(self, chunk):
+        if not len(chunk):
+            return
+        times = numeric_column(chunk, 'Time_ms').to_numpy()
+        valid = np.isfinite(times)
+        times = times[valid]
+        if not len(times):
+            return
+
+        for col in FLAG_COLUMNS:
+            values = numeric_column(chunk, col).to_numpy()[valid]
+            is_set = (values != 0) & ~np.isnan(values)
+            carried = self.open[col]
+            edges = np.diff(np.concatenate(([carried is not None], is_set)).astype(np.int8))
+            starts = np.flatnonzero(edges == 1)
+            ends = np.flatnonzero(edges == -1)
+            if carried is not None:
+                # Эпизод прошлого чанка продолжается с первого отсчета
+                starts = np.concatenate(([0], starts))
+
+            # У незаконченного эпизода граница - конец чанка
+            bounds = np.append(ends, len(times)) if len(starts) > len(ends) else ends
+            start_times = times[starts]
+            samples = bounds - starts
+            if carried is not None:
+                start_times[0] = carried[0]
+                samples[0] += carried[1]
+
+            closed = len(ends)
+            for start, end, count in zip(start_times[:closed], times[ends], samples[:closed]):
+                self.episodes.append([col, _number(start), _number(end),
+                                      _number(end - start), int(count)])
+            self.open[col] = ([float(start_times[-1]), int(samples[-1])]
+                              if len(starts) > closed else None)
+        self.last_time = float(times[-1])
+
+    def finish(self):
+        """Закрывает незаконченные эпизоды последним отсчетом; возвращает episodes,
+        упорядоченные по времени начала"""
+        for col, carried in self.open.items():
+            if carried is not None:
+                start, count = carried
+                self.episodes.append([col, _number(start), _number(self.last_time),
+                                      _number(self.last_time - start), count])
+                self.open[col] = None
+        self.episodes.sort(key=lambda row: (row[1], FLAG_COLUMNS.index(row[0])))
+        return self.episodes
+
+
+def save_episodes(path, episodes):
+    """Сохраняет эпизоды в CSV в формате выходного CSV (';', UTF-8 с BOM)"""
+    with open(path + '.part', 'w', encoding='utf-8-sig', newline='') as f:
+        pd.DataFrame(episodes, columns=COLUMNS).to_csv(f, sep=';', index=False)
+    os.replace(path + '.part', path)
@@ -0,0 +1,234 @@
+"""Дописывание в CSV строк, добавленных в файл MonitorHead во время записи.
+
+Рядом с выходным файлом хранится состояние session.csv.follow.json:
+смещение последней обработанной строки во входном файле, контрольная
+сумма блока перед ним и кодировка файла. Следующие проходы разбирают
+файл в той же кодировке: выборка по выросшему файлу могла бы определить
+другую. При следующем запуске разбираются только новые
+строки. Если входной файл усечен или заменен (контрольная сумма не
+совпадает), CSV создается заново.
+
+    python -m converter_follow session.txt -o session.csv
+    python -m converter_follow session.txt --poll 2
+"""
+import sys
+import os
+import json
+import time
+import zlib
+import argparse
+from dataclasses import dataclass
+
+import converter_engine
+
+# Версия формата файла состояния
+STATE_VERSION = 2
+
+# Сколько байт перед смещением входит в контрольную сумму
+CHECK_SIZE = 4096
+
+
+@dataclass
+class FollowResult:
+    """Итог одного прохода слежения"""
+    output_file: str
+    rows_added: int
+    rows: int
+    skipped: int
+    offset: int
+    # True, если CSV создан заново (первый запуск, усечение или замена файла)
+    rebuilt: bool
+
+
+def state_path(output_file):
+    """Файл состояния рядом с выходным файлом"""
+    return output_file + '.follow.json'
+
+
+def load_state(output_file):
+    """Состояние прошлого прохода или None"""
+    try:
+        with open(state_path(output_file), encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get('version') != STATE_VERSION:
+        return None
+    return state
+
+
+def save_state(output_file, state):
+    """Атомарно сохраняет состояние"""
+    path = state_path(output_file)
+    with open(path + '.part', 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(path + '.part', path)
+
+
+def block_checksum(f, offset):
+    """CRC32 блока из CHECK_SIZE байт перед offset"""
+    start = max(0, offset - CHECK_SIZE)
+    f.seek(start)
+    return zlib.crc32(f.read(offset - start))
+
+
+def complete_lines_end(f, size):
+    """Смещение за последним \\n: недописанная строка остается на следующий проход"""
+    pos = size
+    while pos > 0:
+        start = max(0, pos - (1 << 16))
+        f.seek(start)
+        newline = f.read(pos - start).rfind(b'\n')
+        if newline >= 0:
+            return start + newline + 1
+        pos = start
+    return 0
+
+
+def _can_append(state, input_file, output_file, f, size):
+    """Можно ли продолжить с сохраненного смещения"""
+    if state is None or state['input_file'] != os.path.abspath(input_file):
+        return False
+    if not os.path.exists(output_file):
+        return False
+    offset = state['offset']
+    if offset > size or block_checksum(f, offset) != state['checksum']:
+        return False
+    # Сбой между дописыванием CSV и сохранением состояния: лишний хвост
+    # отрезается, если CSV короче записанного - создается заново
+    output_size = os.path.getsize(output_file)
+    if output_size < state['output_size']:
+        return False
+    if output_size > state['output_size']:
+        os.truncate(output_file, state['output_size'])
+    return True
+
+
+def follow(input_file, output_file, on_progress=None, on_message=None,
+           parser='vectorized', encoding=None):
+    """Дописывает в CSV строки, появившиеся во входном файле с прошлого прохода.
+
+    Разбираются только полные строки (заканчивающиеся \\n). В первый раз,
+    а также при усечении или замене входного файла CSV создается заново.
+    on_progress, on_message и encoding - как в converter_engine.convert().
+    """
+    def message(text):
+        if on_message:
+            on_message(text)
+
+    state = load_state(output_file)
+    size = os.path.getsize(input_file)
+    with open(input_file, 'rb') as f:
+        end = complete_lines_end(f, size)
+        append = _can_append(state, input_file, output_file, f, size)
+
+    if append and encoding is None:
+        # Кодировка первого прохода, а не новая выборка
+        encoding = state['encoding']
+    detected = converter_engine.input_encoding(input_file, encoding)
+    recoded = append and detected.encoding != state['encoding']
+    if recoded:
+        # Явно задана другая кодировка: прежние строки разобраны в старой
+        message(f"Кодировка изменена: {state['encoding']} -> {detected.encoding}, "
+                f"CSV создается заново")
+        append = False
+
+    if append:
+        start, rows, skipped = state['offset'], state['rows'], state['skipped']
+        if end <= start:
+            return FollowResult(output_file, 0, rows, skipped, start, False)
+        message(f"Новых данных: {end - start:,} байт")
+        output = converter_engine.CsvOutput(output_file, append=True)
+    else:
+        start, rows, skipped = detected.bom, 0, 0
+        # Файл с BOM, но еще без полной строки: следующий проход начнет после BOM
+        end = max(end, start)
+        if state is not None and not recoded:
+            message("Входной файл изменен, CSV создается заново")
+        output = converter_engine.CsvOutput(converter_engine.part_path(output_file))
+
+    rows_added = 0
+    bytes_read = 0
+    reporter = converter_engine.ProgressReporter(on_progress, end - start)
+    try:
+        for chunk, block_skipped, block_bytes in converter_engine.parse_file(
+                input_file, end, parser, start=start, encoding=detected.encoding):
+            if len(chunk):
+                output.write_chunk(chunk)
+                rows_added += len(chunk)
+            skipped += block_skipped
+            bytes_read += block_bytes
+            reporter.update(bytes_read, rows + rows_added, skipped)
+        output.close()
+        if not append:
+            os.replace(output.path, output_file)
+    except BaseException:
+        output.abort()
+        raise
+
+    rows += rows_added
+    with open(input_file, 'rb') as f:
+        checksum = block_checksum(f, end)
+    save_state(output_file, {
+        'version': STATE_VERSION,
+        'input_file': os.path.abspath(input_file),
+        'offset': end,
+        'checksum': checksum,
+        'encoding': detected.encoding,
+        'output_size': os.path.getsize(output_file),
+        'rows': rows,
+        'skipped': skipped,
+    })
+    return FollowResult(output_file, rows_added, rows, skipped, end, not append)
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='converter_follow',
+        description='Дописывание в CSV новых строк растущего файла MonitorHead'
+    )
+    parser.add_argument('input', help='исходный файл .txt')
+    parser.add_argument('-o', '--output',
+                        help='выходной файл CSV (по умолчанию рядом с исходным)')
+    parser.add_argument('--poll', type=float,
+                        help='проверять файл каждые N секунд до Ctrl+C')
+    parser.add_argument('--parser', choices=converter_engine.PARSERS, default='vectorized',
+                        help='способ разбора (rows — построчный эталон)')
+    parser.add_argument('--encoding',
+                        help='кодировка исходного файла (по умолчанию определяется автоматически)')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='не выводить сообщения о ходе работы')
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    output_file = args.output or converter_engine.default_output_path(args.input, 'csv')
+
+    if not os.path.exists(args.input):
+        print("Входной файл не существует!", file=sys.stderr)
+        return 1
+
+    def on_message(text):
+        if not args.quiet:
+            print(text, file=sys.stderr)
+
+    try:
+        while True:
+            result = follow(args.input, output_file, on_message=on_message,
+                            parser=args.parser, encoding=args.encoding)
+            if not args.quiet and (result.rows_added or result.rebuilt):
+                print(f"Добавлено строк: {result.rows_added} (всего {result.rows})")
+            if args.poll is None:
+                break
+            time.sleep(args.poll)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"Ошибка при конвертации:\n{str(e)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""Манифест конвертаций для пропуска неизменившихся файлов.
+
+В папке результатов хранится conversion_manifest.json: для каждого
+выходного файла - размер, время изменения и SHA-256 исходного файла,
+параметры конвертации и список созданных файлов (вместе с файлами
+сводки и эпизодов). Повторная конвертация
+пропускает файл, если исходник и параметры не изменились, а результаты
+на месте. Хеш пересчитывается, только если изменились размер или время
+изменения исходника.
+"""
+import os
+import json
+import hashlib
+import inspect
+
+import converter_engine
+import converter_summary
+import converter_episodes
+
+MANIFEST_NAME = 'conversion_manifest.json'
+
+# Версия формата файла манифеста (2 - в output_files есть файлы сводки и эпизодов)
+MANIFEST_VERSION = 2
+
+# Параметры convert(), которые влияют на содержимое результата
+# (parser и workers дают одинаковый результат и не учитываются)
+OUTPUT_OPTIONS = ('xlsx_numbers', 'max_rows', 'split', 'compression', 'bucket_ms', 'flag_agg',
+                  'start_ms', 'end_ms', 'summary', 'episodes', 'chart_points')
+
+
+def conversion_settings(output_format, options):
+    """Параметры, при изменении которых файл конвертируется заново.
+
+    Незаданные параметры берутся по умолчанию из convert(), поэтому
+    запуски из командной строки и из приложения дают одни и те же параметры.
+    """
+    defaults = inspect.signature(converter_engine.convert).parameters
+    settings = {
+        'format': output_format,
+        'schema': converter_engine.SCHEMA_VERSION,
+    }
+    for name in OUTPUT_OPTIONS:
+        settings[name] = options.get(name, defaults[name].default)
+    return settings
+
+
+def file_hash(path):
+    """SHA-256 содержимого файла"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(converter_engine.BLOCK_SIZE)
+            if not data:
+                break
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def fingerprint(input_file, entry=None):
+    """Размер, время изменения и хеш исходного файла; хеш берется из записи
+    манифеста entry, если файл с тех пор не трогали"""
+    stat = os.stat(input_file)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        sha256 = entry['sha256']
+    else:
+        sha256 = file_hash(input_file)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}
+
+
+class Manifest:
+    """Манифест конвертаций одной папки результатов"""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.entries = {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == MANIFEST_VERSION:
+            self.entries = data.get('files', {})
+
+    def _key(self, output_file):
+        return os.path.relpath(os.path.abspath(output_file), os.path.abspath(self.output_dir))
+
+    def entry(self, output_file):
+        """Запись манифеста для выходного файла (None, если ее нет)"""
+        return self.entries.get(self._key(output_file))
+
+    def lookup(self, input_file, output_file, settings):
+        """Запись манифеста, если результат актуален, иначе None"""
+        entry = self.entries.get(self._key(output_file))
+        if (entry is None or entry['input_file'] != os.path.abspath(input_file)
+                or entry['settings'] != settings):
+            return None
+        if not all(os.path.exists(os.path.join(self.output_dir, path))
+                   for path in entry['output_files']):
+            return None
+
+        stat = os.stat(input_file)
+        if stat.st_size != entry['size']:
+            return None
+        if stat.st_mtime_ns != entry['mtime_ns']:
+            # Файл "тронут", но содержимое могло не измениться
+            current = fingerprint(input_file)
+            if current['sha256'] != entry['sha256']:
+                return None
+            entry.update(current)
+        return entry
+
+    def record(self, input_file, output_file, settings, result, input_fingerprint=None):
+        """Запоминает успешную конвертацию (ConversionResult).
+
+        input_fingerprint - fingerprint() исходного файла, если он уже посчитан
+        (пакетная конвертация считает его в процессе пула).
+        """
+        key = self._key(output_file)
+        if input_fingerprint is None:
+            input_fingerprint = fingerprint(input_file, self.entries.get(key))
+        output_files = list(result.output_files)
+        # Сводка и эпизоды пишутся рядом с результатом: без них он не актуален
+        if settings['summary']:
+            output_files.append(converter_summary.summary_path(output_file))
+        if settings['episodes'] and settings['format'] != 'xlsx':
+            output_files.append(converter_episodes.episodes_path(output_file))
+        entry = {
+            'input_file': os.path.abspath(input_file),
+            **input_fingerprint,
+            'settings': settings,
+            'output_files': [self._key(path) for path in output_files],
+            'sheets': result.sheets,
+            'rows': result.rows,
+            'skipped': result.skipped,
+        }
+        self.entries[key] = entry
+
+    def save(self):
+        """Атомарно сохраняет манифест"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(self.path + '.part', 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': self.entries}, f,
+                      ensure_ascii=False, indent=2)
+        os.replace(self.path + '.part', self.path)
+
+    def result(self, output_file, entry):
+        """ConversionResult по записи манифеста (для пропущенного файла)"""
+        output_files = [os.path.join(self.output_dir, path) for path in entry['output_files']]
+        return converter_engine.ConversionResult(
+            output_file, entry['rows'],
+            sum(os.path.getsize(path) for path in output_files),
+            entry['skipped'], output_files, entry['sheets']
+        )
@@ -0,0 +1,116 @@
+"""Конвейер конвертации: этапы в отдельных потоках, связанные очередями.
+
+Этап выполняет итератор в своем потоке и передает элементы следующему
+этапу через очередь глубиной QUEUE_DEPTH. Когда очередь полна, этап
+ждет, пока следующий заберет элемент (обратное давление), поэтому
+в памяти одновременно не больше нескольких блоков, какой бы ни была
+длина файла. Чтение диска, разбор и запись идут одновременно: пока
+пишется один чанк, следующий уже разбирается, а блок после него читается.
+
+Исключение этапа передается по очереди и выбрасывается у потребителя.
+Если потребитель прекращает чтение (ошибка, отмена, close()), этап
+останавливается после текущего элемента, а его итератор закрывается
+в том же потоке, что и выполнялся.
+
+cProfile видит только поток, в котором включен, поэтому внутри inline()
+этапы выполняются на месте, в потоке потребителя.
+"""
+import time
+import queue
+import threading
+from contextlib import contextmanager
+
+# Глубина очереди между этапами, элементов
+QUEUE_DEPTH = 4
+
+# Как часто ожидающий этап проверяет остановку конвейера, секунд
+POLL_INTERVAL = 0.1
+
+# Конец данных этапа
+_DONE = object()
+
+
+# Флаг inline() для каждого потока
+_local = threading.local()
+
+
+@contextmanager
+def inline():
+    """Этапы, запущенные в этом потоке внутри with, выполняются без своих
+    потоков: последовательно, в потоке потребителя"""
+    previous = getattr(_local, 'inline', False)
+    _local.inline = True
+    try:
+        yield
+    finally:
+        _local.inline = previous
+
+
+class _Failure:
+    """Исключение этапа, переданное по очереди"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def stage(source, depth=QUEUE_DEPTH, name=None, on_cpu=None):
+    """Выполняет итератор source в отдельном потоке и выдает его элементы.
+
+    Поток опережает потребителя не больше чем на depth элементов.
+    on_cpu(секунды) получает время процессора потока этапа, когда тот
+    закончил работу (до выхода из stage).
+    """
+    if getattr(_local, 'inline', False):
+        yield from source
+        return
+
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        # Ожидание с таймаутом: остановленный потребитель не заберет элемент
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def run():
+        cpu = time.thread_time()
+        iterator = iter(source)
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+            if on_cpu is not None:
+                on_cpu(time.thread_time() - cpu)
+
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    try:
+        while True:
+            try:
+                # С таймаутом, чтобы Ctrl+C прерывал ожидание и в Windows
+                item = items.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+        # Непрочитанные элементы освобождаются сразу, а не со сборкой мусора
+        while not items.empty():
+            items.get_nowait()
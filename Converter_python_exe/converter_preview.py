@@ -0,0 +1,139 @@
+"""Предпросмотр исходного файла MonitorHead без конвертации.
+
+LineIndex хранит смещение только каждой STRIDE-й строки файла
+(разреженный индекс): строка с любым номером читается, начиная
+с ближайшей отметки, не дальше STRIDE строк. Индекс строится блоками
+через mmap (numpy находит концы строк), отметки занимают около 8 байт
+на STRIDE строк. Концы строк те же, что у движка: \n, \r\n
+и одиночный \r, поэтому номера строк совпадают с конвертацией.
+
+PreviewReader читает строки страницами по STRIDE строк и разбирает их
+converter_engine.parse_line — так же, как при конвертации, поэтому
+в предпросмотре видны те же значения, что попадут в файл. В памяти
+держится не больше CACHE_PAGES страниц, сколько бы строк ни было
+в файле.
+"""
+import io
+import os
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+
+import converter_engine
+
+# Строк между соседними отметками индекса (и строк на странице)
+STRIDE = 1024
+
+# Сколько разобранных страниц хранится в памяти
+CACHE_PAGES = 32
+
+# Размер блока при построении индекса
+INDEX_BLOCK_SIZE = 16 << 20
+
+
+def _line_ends(data):
+    """Позиции последних байт концов строк: \n и одиночного \r.
+
+    Блок map_blocks заканчивается на \n (кроме последнего), поэтому
+    \r\n между блоками не разрывается.
+    """
+    newlines = np.flatnonzero(data == ord('\n'))
+    returns = np.flatnonzero(data == ord('\r'))
+    if not len(returns):
+        return newlines
+    # \r, за которым не идет \n (или последний байт блока)
+    following = np.minimum(returns + 1, len(data) - 1)
+    lone = returns[(returns == len(data) - 1) | (data[following] != ord('\n'))]
+    if not len(lone):
+        return newlines
+    return np.sort(np.concatenate((newlines, lone)))
+
+
+class LineIndex:
+    """Разреженный индекс строк: смещение каждой stride-й строки.
+
+    Строится постепенно (build), до окончания доступны уже
+    проиндексированные строки.
+    """
+
+    def __init__(self, path, start=0, stride=STRIDE):
+        self.path = path
+        self.start = start
+        self.stride = stride
+        # offsets[k] - смещение строки k * stride
+        self.offsets = array('q')
+        # Число проиндексированных строк (после build - всех строк файла)
+        self.lines = 0
+        self.done = False
+
+    def build(self, block_size=INDEX_BLOCK_SIZE):
+        """Индексирует файл блоками, после каждого выдает число строк"""
+        with open(self.path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            pos = self.start
+            for block in converter_engine.map_blocks(f, self.start, size, block_size):
+                data = np.frombuffer(block, dtype=np.uint8)
+                ends = _line_ends(data)
+                # Начала строк блока; строка без конца строки в конце файла
+                # тоже считается
+                starts = np.concatenate(([0], ends + 1))
+                count = len(ends) + (1 if len(data) and data[-1] not in b'\r\n' else 0)
+                starts = starts[:count]
+
+                first = -self.lines % self.stride
+                self.offsets.extend((starts[first::self.stride] + pos).tolist())
+                self.lines += count
+                pos += len(data)
+                # Массив ссылается на mmap, его нужно отпустить до закрытия файла
+                del data
+                yield self.lines
+        self.done = True
+
+
+class PreviewReader:
+    """Строки файла по номеру: (поля после разбора или None, исходный текст).
+
+    None вместо полей - строка пропускается при конвертации
+    (пустая, комментарий, неполная).
+    """
+
+    def __init__(self, path, encoding='utf-8', start=0, stride=STRIDE):
+        self.path = path
+        self.encoding = encoding
+        self.index = LineIndex(path, start, stride)
+        self._pages = OrderedDict()
+
+    @classmethod
+    def open(cls, path, encoding=None):
+        """Читатель с кодировкой, определенной как при конвертации
+        (converter_engine.input_encoding, BOM пропускается)"""
+        detected = converter_engine.input_encoding(path, encoding)
+        return cls(path, detected.encoding, detected.bom)
+
+    def row(self, number):
+        page = self._page(number // self.index.stride)
+        offset = number % self.index.stride
+        return page[offset] if offset < len(page) else (None, '')
+
+    def _page(self, number):
+        page = self._pages.get(number)
+        if page is not None:
+            self._pages.move_to_end(number)
+            return page
+
+        page = []
+        with open(self.path, 'rb') as raw:
+            raw.seek(self.index.offsets[number])
+            # newline=None делит строки так же, как движок (parse_rows)
+            f = io.TextIOWrapper(raw, self.encoding, errors='replace', newline=None)
+            for _ in range(self.index.stride):
+                text = f.readline()
+                if not text:
+                    break
+                page.append((converter_engine.parse_line(text), text.rstrip('\n')))
+
+        self._pages[number] = page
+        if len(self._pages) > CACHE_PAGES:
+            self._pages.popitem(last=False)
+        return page
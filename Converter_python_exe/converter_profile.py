@@ -0,0 +1,236 @@
+"""Замер времени и памяти по этапам конвертации.
+
+StageTimings накапливает для каждого этапа время по часам и время
+процессора потока, выполнившего этап (разбор идет в потоках конвейера,
+их время добавляется к этапу через add_cpu; процессы параллельного
+разбора не учитываются), число вызовов и память: наибольший RSS процесса
+на выходе из этапа и, если включен tracemalloc, пик памяти,
+выделенной Python и numpy внутри этапа. Итог (report) попадает
+в ConversionResult.timings, показывается в приложении и может
+дописываться в журнал JSON Lines.
+
+profile_run() включает cProfile для одного запуска и сохраняет
+статистику в файл .prof (смотреть: python -m pstats run.prof, snakeviz).
+"""
+import os
+import sys
+import json
+import time
+import tracemalloc
+import cProfile
+from contextlib import contextmanager
+from datetime import datetime
+
+import converter_pipeline
+
+# Этапы конвертации в порядке выполнения и их названия для сообщений
+STAGES = {
+    'index': 'Индекс Time_ms',
+    'parse': 'Чтение и разбор',
+    'summary': 'Сводка',
+    'episodes': 'Эпизоды',
+    'chart': 'Ряды графиков',
+    'aggregate': 'Прореживание',
+    'write': 'Запись строк',
+    'finalize': 'Сохранение файла',
+}
+
+# Журнал замеров в папке результатов (по строке JSON на конвертацию)
+TIMINGS_LOG = 'conversion_timings.jsonl'
+
+
+def current_rss():
+    """Текущий объем памяти процесса в байтах (None, если неизвестен)"""
+    if sys.platform == 'win32':
+        counters = _memory_counters_windows()
+        return counters.WorkingSetSize if counters else None
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss():
+    """Пиковый объем памяти процесса с его запуска в байтах (None, если неизвестен)"""
+    if sys.platform == 'win32':
+        counters = _memory_counters_windows()
+        return counters.PeakWorkingSetSize if counters else None
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux сообщает килобайты, macOS - байты
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _memory_counters_windows():
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ('cb', wintypes.DWORD),
+                ('PageFaultCount', wintypes.DWORD),
+                ('PeakWorkingSetSize', ctypes.c_size_t),
+                ('WorkingSetSize', ctypes.c_size_t),
+                ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                ('PagefileUsage', ctypes.c_size_t),
+                ('PeakPagefileUsage', ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters),
+                                                     counters.cb):
+            return counters
+    except (AttributeError, OSError):
+        pass
+    return None
+
+
+class StageTimings:
+    """Время и память по этапам одной конвертации.
+
+    trace_memory включает tracemalloc на время конвертации: пик памяти
+    каждого этапа становится точным, но выделение памяти замедляется
+    в несколько раз, поэтому по умолчанию память оценивается по RSS.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.started = None
+        self.wall = 0.0
+        self.cpu = 0.0
+        self._own_trace = False
+
+    def start(self):
+        self.started = (time.perf_counter(), time.process_time())
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._own_trace = True
+
+    def stop(self):
+        if self.started is None:
+            return
+        self.wall = time.perf_counter() - self.started[0]
+        self.cpu = time.process_time() - self.started[1]
+        self.started = None
+        if self._own_trace:
+            tracemalloc.stop()
+            self._own_trace = False
+
+    @contextmanager
+    def stage(self, name):
+        """Добавляет время выполнения блока with к этапу name"""
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.thread_time() - cpu
+            stage = self._stage(name)
+            stage['wall'] += wall
+            stage['cpu'] += cpu
+            stage['calls'] += 1
+            rss = current_rss()
+            if rss is not None and (stage['rss'] is None or rss > stage['rss']):
+                stage['rss'] = rss
+            if tracing:
+                peak = tracemalloc.get_traced_memory()[1] - base
+                if stage['traced_peak'] is None or peak > stage['traced_peak']:
+                    stage['traced_peak'] = peak
+
+    def _stage(self, name):
+        return self.stages.setdefault(
+            name, {'wall': 0.0, 'cpu': 0.0, 'calls': 0, 'rss': None, 'traced_peak': None}
+        )
+
+    def add_cpu(self, name, seconds):
+        """Добавляет к этапу name время процессора другого потока
+        (converter_pipeline.stage, on_cpu)"""
+        self._stage(name)['cpu'] += seconds
+
+    def timed(self, name, iterable):
+        """Элементы iterable; время получения каждого относится к этапу name"""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def report(self):
+        """Итог замеров (словарь для JSON)"""
+        stages = {}
+        for name, stage in self.stages.items():
+            stages[name] = {
+                'wall': round(stage['wall'], 4),
+                'cpu': round(stage['cpu'], 4),
+                'calls': stage['calls'],
+                'rss': stage['rss'],
+                'traced_peak': stage['traced_peak'],
+            }
+        return {
+            'wall': round(self.wall, 4),
+            'cpu': round(self.cpu, 4),
+            'peak_rss': peak_rss(),
+            'trace_memory': self.trace_memory,
+            'stages': stages,
+        }
+
+
+def _megabytes(size):
+    return f"{size / (1 << 20):,.0f} МБ"
+
+
+def format_timings(report):
+    """Разбивка по этапам для сообщений: список строк"""
+    lines = []
+    for name, stage in report['stages'].items():
+        text = f"{STAGES.get(name, name)}: {stage['wall']:.2f} с (ЦП {stage['cpu']:.2f} с)"
+        if stage['traced_peak'] is not None:
+            text += f", пик {_megabytes(stage['traced_peak'])}"
+        lines.append(text)
+    lines.append(f"Всего: {report['wall']:.2f} с (ЦП {report['cpu']:.2f} с)")
+    if report['peak_rss']:
+        lines.append(f"Пик памяти процесса: {_megabytes(report['peak_rss'])}")
+    return lines
+
+
+def append_log(path, report, **details):
+    """Дописывает замер в журнал JSON Lines (по объекту на строку)"""
+    entry = {'created': datetime.now().isoformat(timespec='seconds'), **details, **report}
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+
+@contextmanager
+def profile_run(path):
+    """cProfile для блока with; статистика сохраняется в path (.prof).
+
+    Профилируется только текущий поток, поэтому этапы конвейера
+    (converter_pipeline) выполняются в нем же, без своих потоков.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        with converter_pipeline.inline():
+            yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
@@ -0,0 +1,196 @@
+"""Сводная статистика сеанса за один проход по данным.
+
+SummaryStats накапливает по ходу разбора, по каждому чанку векторно:
+
+- для PITCH, ROLL и YAW — число значений, минимум, максимум, среднее
+  и стандартное отклонение (выборочное, как СТАНДОТКЛОН.В в Excel);
+- по Time_ms — начало, конец и длительность записи, интервал между
+  соседними отсчетами (среднее, разброс, минимум, максимум) и частоту;
+- для Dizziness и Nystagmus — число отсчетов с флагом и суммарное время,
+  когда флаг был установлен: отсчет с флагом занимает интервал до
+  следующего отсчета.
+
+Среднее и дисперсия считаются методом Уэлфорда: по чанку находятся
+число, среднее и сумма квадратов отклонений, которые объединяются
+с накопленными (формула Чана), поэтому точность не теряется на
+миллионах отсчетов, а второй проход не нужен. Последний отсчет чанка
+переносится в следующий, чтобы интервал на границе не потерялся.
+"""
+import os
+import json
+import math
+
+import numpy as np
+
+from converter_engine import ANGLE_COLUMNS, FLAG_COLUMNS, numeric_column
+
+# Имя листа сводки в XLSX
+SHEET_NAME = 'Summary'
+
+
+def summary_path(output_file):
+    """Файл сводки JSON рядом с результатом: session.xlsx -> session.summary.json"""
+    return os.path.splitext(output_file)[0] + '.summary.json'
+
+
+class RunningStats:
+    """Число, минимум, максимум, среднее и дисперсия потока значений"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        # Сумма квадратов отклонений от среднего
+        self.m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add(self, values):
+        """Добавляет массив значений (NaN пропускаются)"""
+        values = values[~np.isnan(values)]
+        count = len(values)
+        if not count:
+            return
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else None
+
+    def result(self):
+        if not self.count:
+            return {'count': 0, 'min': None, 'max': None, 'mean': None, 'std': None}
+        return {
+            'count': self.count,
+            'min': self.minimum,
+            'max': self.maximum,
+            'mean': self.mean,
+            'std': self.std,
+        }
+
+
+class SummaryStats:
+    """Потоковая сводка по чанкам разбора (add), итог — result()"""
+
+    def __init__(self):
+        self.rows = 0
+        self.angles = {col: RunningStats() for col in ANGLE_COLUMNS}
+        self.intervals = RunningStats()
+        self.first_time = None
+        self.last_time = None
+        # Флаги последнего отсчета с числовым Time_ms (для интервала до следующего)
+        self.last_flags = {col: False for col in FLAG_COLUMNS}
+        self.flag_samples = {col: 0 for col in FLAG_COLUMNS}
+        self.flag_time = {col: 0.0 for col in FLAG_COLUMNS}
+
+    def add(self, chunk):
+        if not len(chunk):
+            return
+        self.rows += len(chunk)
+        for col in ANGLE_COLUMNS:
+            self.angles[col].add(numeric_column(chunk, col).to_numpy())
+
+        flags = {}
+        for col in FLAG_COLUMNS:
+            values = numeric_column(chunk, col).to_numpy()
+            # NaN != 0 истинно, поэтому нечисловые значения отбрасываются отдельно
+            flags[col] = (values != 0) & ~np.isnan(values)
+            self.flag_samples[col] += int(np.count_nonzero(flags[col]))
+
+        times = numeric_column(chunk, 'Time_ms').to_numpy()
+        valid = np.isfinite(times)
+        times = times[valid]
+        if not len(times):
+            return
+        if self.first_time is None:
+            self.first_time = float(times[0])
+            previous = times[:0]
+        else:
+            previous = np.array([self.last_time])
+        steps = np.diff(np.concatenate((previous, times)))
+        self.intervals.add(steps)
+
+        # Интервал i начинается отсчетом i: флаг этого отсчета
+        # (для первого интервала - последний отсчет прошлого чанка)
+        held = np.clip(steps, 0, None)
+        for col in FLAG_COLUMNS:
+            is_set = flags[col][valid]
+            if len(previous):
+                starts = np.concatenate(([self.last_flags[col]], is_set[:-1]))
+            else:
+                starts = is_set[:-1]
+            self.flag_time[col] += float(held[starts].sum())
+            self.last_flags[col] = bool(is_set[-1])
+        self.last_time = float(times[-1])
+
+    def result(self):
+        """Итог (словарь для JSON)"""
+        duration = (self.last_time - self.first_time) if self.first_time is not None else None
+        intervals = self.intervals.result()
+        mean_interval = intervals['mean']
+        flags = {}
+        for col in FLAG_COLUMNS:
+            flags[col] = {
+                'samples': self.flag_samples[col],
+                'time_ms': self.flag_time[col],
+                'fraction': self.flag_time[col] / duration if duration else None,
+            }
+        return {
+            'rows': self.rows,
+            'time': {
+                'first_ms': self.first_time,
+                'last_ms': self.last_time,
+                'duration_ms': duration,
+                'interval_mean_ms': mean_interval,
+                'interval_std_ms': intervals['std'],
+                'interval_min_ms': intervals['min'],
+                'interval_max_ms': intervals['max'],
+                'sample_rate_hz': 1000 / mean_interval if mean_interval else None,
+            },
+            'angles': {col: stats.result() for col, stats in self.angles.items()},
+            'flags': flags,
+        }
+
+
+def summary_tables(summary):
+    """Таблицы листа сводки: список (заголовок, строки)"""
+    angles = [
+        [col, stats['count'], stats['min'], stats['max'], stats['mean'], stats['std']]
+        for col, stats in summary['angles'].items()
+    ]
+    time = summary['time']
+    timing = [
+        ['Строк данных', summary['rows']],
+        ['Начало, мс', time['first_ms']],
+        ['Конец, мс', time['last_ms']],
+        ['Длительность, мс', time['duration_ms']],
+        ['Интервал: среднее, мс', time['interval_mean_ms']],
+        ['Интервал: ст. отклонение (джиттер), мс', time['interval_std_ms']],
+        ['Интервал: минимум, мс', time['interval_min_ms']],
+        ['Интервал: максимум, мс', time['interval_max_ms']],
+        ['Частота, Гц', time['sample_rate_hz']],
+    ]
+    flags = [
+        [col, stats['samples'], stats['time_ms'], stats['fraction']]
+        for col, stats in summary['flags'].items()
+    ]
+    return [
+        (['Угол', 'Значений', 'Минимум', 'Максимум', 'Среднее', 'Ст. отклонение'], angles),
+        (['Time_ms', 'Значение'], timing),
+        (['Флаг', 'Отсчетов с флагом', 'Время с флагом, мс', 'Доля времени'], flags),
+    ]
+
+
+def save_summary(path, summary, **details):
+    """Сохраняет сводку в JSON (через временный файл)"""
+    with open(path + '.part', 'w', encoding='utf-8') as f:
+        json.dump({**details, **summary}, f, ensure_ascii=False, indent=2)
+    os.replace(path + '.part', path)
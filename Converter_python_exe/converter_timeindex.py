@@ -0,0 +1,131 @@
+"""Индекс Time_ms для конвертации окна по времени.
+
+Файл делится на участки около INDEX_BLOCK_SIZE байт, выровненные
+по концу строки; для каждого участка индекс хранит смещение
+и наименьшее и наибольшее Time_ms его строк. Окно start_ms <= Time_ms < end_ms
+переводится в диапазон байтов от первого до последнего участка, где
+могут быть строки окна: конвертация читает только этот диапазон,
+а строки вне окна на его краях отбрасываются. В файлах MonitorHead
+Time_ms растет, и диапазон лишь на участок шире окна; если время идет
+не по порядку, диапазон охватывает все участки со строками окна,
+и результат все равно верен.
+
+Индекс строится одним проходом при первой конвертации окна и сохраняется
+рядом с исходным файлом (session.txt.timeindex.json). Пока файл
+не изменился (размер и время изменения), следующие окна берутся из него
+без чтения файла. Если рядом с файлом нельзя писать, индекс живет
+только до конца конвертации.
+"""
+import os
+import json
+
+import numpy as np
+
+import converter_engine
+
+# Версия формата файла индекса
+TIMEINDEX_VERSION = 1
+
+# Размер участка индекса: на столько байт окно может быть шире нужного
+INDEX_BLOCK_SIZE = 256 << 10
+
+
+def index_path(input_file):
+    """Файл индекса рядом с исходным файлом"""
+    return input_file + '.timeindex.json'
+
+
+class TimeIndex:
+    """Разреженный индекс: смещение участка -> диапазон Time_ms его строк.
+
+    start — смещение первой строки (после BOM).
+    """
+
+    def __init__(self, input_file, encoding='utf-8', start=0):
+        stat = os.stat(input_file)
+        self.input_file = input_file
+        self.path = index_path(input_file)
+        self.encoding = encoding
+        self.start = start
+        self.identity = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'encoding': encoding,
+            'start': start,
+        }
+        # offsets[i] - начало участка i, последний элемент - конец файла
+        self.offsets = []
+        # Наименьшее и наибольшее Time_ms участка (None - нет числовых Time_ms)
+        self.minimum = []
+        self.maximum = []
+        self.done = False
+
+    def load(self):
+        """Загружает сохраненный индекс; False, если его нет или файл изменился"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if state.get('version') != TIMEINDEX_VERSION:
+            return False
+        if any(state.get(key) != value for key, value in self.identity.items()):
+            return False
+        self.offsets = state['offsets']
+        self.minimum = state['minimum']
+        self.maximum = state['maximum']
+        self.done = True
+        return True
+
+    def build(self, parser='vectorized', block_size=INDEX_BLOCK_SIZE):
+        """Индексирует файл, после каждого участка выдает смещение его конца.
+
+        Строки разбираются так же, как при конвертации (parse_block),
+        поэтому в индекс попадают те же значения Time_ms.
+        """
+        self.offsets, self.minimum, self.maximum = [], [], []
+        pos = self.start
+        with open(self.input_file, 'rb') as f:
+            for block in converter_engine.map_blocks(f, self.start, self.identity['size'],
+                                                     block_size):
+                chunk, _ = converter_engine.parse_block(block, parser, self.encoding)
+                times = converter_engine.numeric_column(chunk, 'Time_ms').to_numpy()
+                times = times[np.isfinite(times)]
+                self.offsets.append(pos)
+                self.minimum.append(float(times.min()) if len(times) else None)
+                self.maximum.append(float(times.max()) if len(times) else None)
+                pos += len(block)
+                yield pos
+        self.offsets.append(pos)
+        self.done = True
+
+    def save(self):
+        """Сохраняет индекс рядом с исходным файлом (молча, если нельзя)"""
+        state = {
+            'version': TIMEINDEX_VERSION,
+            **self.identity,
+            'offsets': self.offsets,
+            'minimum': self.minimum,
+            'maximum': self.maximum,
+        }
+        try:
+            with open(self.path + '.part', 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(self.path + '.part', self.path)
+        except OSError:
+            pass
+
+    def byte_range(self, start_ms=None, end_ms=None):
+        """Диапазон байтов (начало, конец) со всеми строками окна
+        start_ms <= Time_ms < end_ms; None, если таких строк нет"""
+        first = last = None
+        for i, (low, high) in enumerate(zip(self.minimum, self.maximum)):
+            if low is None:
+                continue
+            if (start_ms is None or high >= start_ms) and (end_ms is None or low < end_ms):
+                if first is None:
+                    first = i
+                last = i
+        if first is None:
+            return None
+        return self.offsets[first], self.offsets[last + 1]
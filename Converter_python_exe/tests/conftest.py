@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Модули конвертера лежат плоско в родительской папке
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
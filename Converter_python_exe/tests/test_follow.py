@@ -0,0 +1,46 @@
+"""Дописывание растущего файла (converter_follow)"""
+import codecs
+
+import converter_follow
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read().splitlines()
+
+
+def test_bom_file_grows_after_first_poll(tmp_path):
+    source = tmp_path / 'session.txt'
+    output = tmp_path / 'session.csv'
+
+    # Первый проход: только BOM и недописанная строка
+    source.write_bytes(codecs.BOM_UTF8 + b'0001;1.5;2;3;0;0')
+    result = converter_follow.follow(str(source), str(output))
+    assert result.rows == 0
+    assert result.offset == len(codecs.BOM_UTF8)
+
+    with open(source, 'ab') as f:
+        f.write(b'\n0002;0.5;-1;4;1;0\n')
+    result = converter_follow.follow(str(source), str(output))
+    assert result.rows == 2
+    lines = read_csv(output)
+    assert lines[1:] == ['1;1,5;2;3;0;0', '2;0,5;-1;4;1;0']
+    # BOM исходного файла не попадает в данные
+    assert not any('\ufeff' in line for line in lines[1:])
+
+
+def test_appends_only_new_lines(tmp_path):
+    source = tmp_path / 'session.txt'
+    output = tmp_path / 'session.csv'
+
+    source.write_bytes(b'# MonitorHead\n0010;1;2;3;0;0\n0020;1;2;3;0;0')
+    result = converter_follow.follow(str(source), str(output))
+    assert result.rows == 1
+    assert result.rebuilt
+
+    with open(source, 'ab') as f:
+        f.write(b'\n0030;1;2;3;1;1\n')
+    result = converter_follow.follow(str(source), str(output))
+    assert result.rows_added == 2
+    assert not result.rebuilt
+    assert read_csv(output)[1:] == ['10;1;2;3;0;0', '20;1;2;3;0;0', '30;1;2;3;1;1']
@@ -0,0 +1,85 @@
+"""Манифест конвертаций (converter_manifest)"""
+import os
+
+import converter_batch
+import converter_engine
+import converter_manifest
+
+
+def test_settings_fill_convert_defaults():
+    args = converter_engine.build_arg_parser().parse_args(['session.txt'])
+    cli = converter_manifest.conversion_settings('csv', converter_engine.conversion_options(args))
+    # Приложение передает не все параметры
+    gui = converter_manifest.conversion_settings('csv', {
+        'xlsx_numbers': False, 'bucket_ms': None, 'summary': False, 'episodes': False,
+    })
+    assert cli == gui
+    assert gui['max_rows'] == converter_engine.EXCEL_MAX_ROWS - 1
+
+
+def write_session(path, rows):
+    path.write_bytes(b'# MonitorHead\n' + b''.join(
+        b'%04d;1.5;2;3;0;0\n' % (i * 10) for i in range(rows)))
+
+
+def test_batch_skips_unchanged_files(tmp_path):
+    source = tmp_path / 'source'
+    source.mkdir()
+    for name in ('a.txt', 'b.txt'):
+        write_session(source / name, 5)
+    inputs = converter_batch.collect_inputs(str(source))
+    output_dir = str(tmp_path / 'out')
+
+    def run():
+        return converter_batch.convert_batch(inputs, output_dir, 'csv', workers=1,
+                                             skip_unchanged=True)
+
+    first = run()
+    assert first.succeeded == 2 and first.unchanged == 0
+    assert all(r.fingerprint['size'] == os.path.getsize(r.input_file) for r in first.files)
+    assert run().unchanged == 2
+
+    # Тронутый файл с тем же содержимым не конвертируется заново
+    stat = os.stat(source / 'a.txt')
+    os.utime(source / 'a.txt', ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert run().unchanged == 2
+
+    write_session(source / 'b.txt', 6)
+    batch = run()
+    assert [r.unchanged for r in batch.files] == [True, False]
+    assert batch.files[1].rows == 6
+
+
+def test_cli_saves_refreshed_entry(tmp_path, monkeypatch):
+    source = tmp_path / 'session.txt'
+    write_session(source, 3)
+    assert converter_engine.main([str(source), '-f', 'csv', '--skip-unchanged', '-q']) == 0
+
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert converter_engine.main([str(source), '-f', 'csv', '--skip-unchanged', '-q']) == 0
+
+    # Третий запуск не пересчитывает хеш: время изменения уже в манифесте
+    hashed = []
+    monkeypatch.setattr(converter_manifest, 'file_hash', hashed.append)
+    assert converter_engine.main([str(source), '-f', 'csv', '--skip-unchanged', '-q']) == 0
+    assert hashed == []
+
+
+def test_missing_sidecar_reconverts(tmp_path):
+    source = tmp_path / 'session.txt'
+    write_session(source, 3)
+    output_dir = str(tmp_path / 'out')
+    inputs = [str(source)]
+
+    def run():
+        return converter_batch.convert_batch(inputs, output_dir, 'csv', workers=1,
+                                             skip_unchanged=True, summary=True, episodes=True)
+
+    first = run()
+    assert first.succeeded == 1
+    assert run().unchanged == 1
+
+    os.remove(os.path.join(output_dir, 'session.episodes.csv'))
+    assert run().unchanged == 0
+    assert os.path.exists(os.path.join(output_dir, 'session.episodes.csv'))
@@ -0,0 +1,74 @@
+"""Векторный разбор совпадает с построчным эталоном (parse_rows)"""
+import random
+
+import pandas as pd
+import pytest
+
+import converter_engine
+
+CASES = {
+    'leading zeros': b'0001;1;2;3;0;0\n0000;1;2;3;0;0\n0;1;2;3;0;0\n000.5;1;2;3;0;0\n',
+    'angle zeros': b'10;007;00,5;000;0;0\n20;00.;-0000.0;00,00;1;1\n',
+    'sign before zeros': b'10;-007;+007;-0;0;0\n20;-000;-00,;--007;0;0\n30;-.5;-007.50;0-1;0;0\n',
+    'dot in angle': b'10;1.5;-0.25;12.340;0;0\n20;.5;0.0.0;..;0;0\n',
+    'comments': b'# MonitorHead v2\n10;1;2;3;0;0\n#x y;1;2;3;4;5\n20;1;2;3;0;0\n',
+    'crlf': b'10;1;2;3;0;0\r\n\r\n20;1.5;2;3;0;0\r\n',
+    'lone cr': b'10;1;2;3;0;0\r20;1;2;3;0;0\n1;2\r3;4;5;6;7\n',
+    'short rows': b'1;2\n3;4;5;6;7;8\n9;1;2;3;4;\n7\n1;2;3;4;5\n;;;;;\n',
+    'long rows': b'5;6;7;8;9;1;2;3\n10;1;2;3;0;0;extra;fields\n',
+    'only short rows': b'1;2;3\n;;\n7\n',
+    'no final newline': b'10;1;2;3;0;0\n20;1;2;3;0;0',
+    'empty': b'',
+    'blank lines': b'\n\n\n',
+    'non-ascii comment': '# Сессия пациента\n10;1,5;2;3;0;0\n'.encode('utf-8'),
+    'leading space': b' 1;2;3;4;5;6\n10;1;2;3;0;0\n',
+    'quotes': b'"1";2;3;4;5;6\n10;1;2;3;0;0\n',
+}
+
+VALUES = ['', '0', '007', '-0.5', '1,25', '+3', '..', '-007.50', '000', '00.5', '-', '-0',
+          '0-1', '00,5', '0.0.0', '--007', '+007', '-00,', '0,', '.5', '-.5', '00.',
+          '0,0,0', '-000', '1', '0+', '12.340', '-0000.0', '00,00']
+
+
+def random_block(rng):
+    lines = []
+    for _ in range(rng.randint(0, 14)):
+        kind = rng.random()
+        if kind < 0.1:
+            lines.append('#x y;1;2;3;4;5')
+        elif kind < 0.15:
+            lines.append('# Комментарий')
+        elif kind < 0.25:
+            lines.append('')
+        elif kind < 0.28:
+            lines.append('1;2\r3;4;5;6;7')
+        else:
+            lines.append(';'.join(rng.choice(VALUES) for _ in range(rng.randint(1, 8))))
+    newline = '\r\n' if rng.random() < 0.3 else '\n'
+    return (newline.join(lines) + (newline if rng.random() < 0.5 else '')).encode('utf-8')
+
+
+def assert_same(block, encoding='utf-8'):
+    expected, expected_skipped = converter_engine.parse_rows(block, encoding)
+    chunk, skipped = converter_engine.parse_vectorized(block, encoding)
+    assert skipped == expected_skipped
+    assert list(chunk.index) == list(range(len(chunk)))
+    pd.testing.assert_frame_equal(chunk, expected)
+
+
+@pytest.mark.parametrize('block', CASES.values(), ids=CASES.keys())
+def test_vectorized_matches_rows(block):
+    assert_same(block)
+    # То же внутри большего блока: участки чистых строк и нерегулярные вперемешку
+    assert_same(b'10;1;2;3;0;0\n' * 50 + block + b'\n' + b'20;1.5;2;3;0;0\n' * 50)
+
+
+def test_non_ascii_comment_cp1251():
+    assert_same('# Сессия\n0010;1.5;2;3;0;0\n'.encode('cp1251'), 'cp1251')
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_vectorized_matches_rows_random(seed):
+    rng = random.Random(seed)
+    for _ in range(300):
+        assert_same(random_block(rng))